@@ -0,0 +1,162 @@
+from datetime import date, timedelta
+
+# Training totals over arbitrary date ranges, compared with the previous
+# equivalent range. Everything is read from rollup_daily, so the cost depends
+# on the number of days in the two ranges, not on the number of workouts.
+GRAINS = ("day", "week", "month", "year")
+
+# bucket start of rollup_daily.day at each grain; weeks start on Monday as in
+# rollups.week_start()
+_BUCKET_SQL = {
+    "day": "day",
+    "week": "date(day, 'weekday 0', '-6 days')",
+    "month": "substr(day, 1, 7) || '-01'",
+    "year": "substr(day, 1, 4) || '-01-01'",
+}
+
+_SUMMED = ("sessions", "minutes", "volume", "performance_sum", "performance_count",
+           "feeling_sum", "feeling_count")
+
+# One pass over the days of both ranges (a primary-key range of rollup_daily):
+# rows are grouped per bucket and per side of `from` (current = 1 for the
+# requested range), and the window sums add the range totals to every row, so
+# no second aggregate query is needed.
+_ANALYTICS_SQL = """
+    WITH buckets AS (
+        SELECT {bucket} AS period, day >= ? AS current,
+               {sums}
+        FROM rollup_daily
+        WHERE {where}
+        GROUP BY current, period
+    )
+    SELECT period, current, {columns},
+           {totals}
+    FROM buckets
+"""
+
+MAX_BUCKETS = 1000
+
+
+def _sql(grain: str, where: list[str]) -> str:
+    return _ANALYTICS_SQL.format(
+        bucket=_BUCKET_SQL[grain],
+        sums=", ".join(f"SUM({c}) AS {c}" for c in _SUMMED),
+        where=" AND ".join(where),
+        columns=", ".join(_SUMMED),
+        totals=", ".join(f"SUM({c}) OVER (PARTITION BY current) AS total_{c}" for c in _SUMMED),
+    )
+
+
+def period_start(d: date, grain: str) -> date:
+    if grain == "week":
+        return d - timedelta(days=d.weekday())
+    if grain == "month":
+        return d.replace(day=1)
+    if grain == "year":
+        return d.replace(month=1, day=1)
+    return d
+
+
+def shift(start: date, grain: str, n: int) -> date:
+    """The bucket start `n` buckets after (n < 0: before) the bucket start `start`."""
+    if grain == "week":
+        return start + timedelta(weeks=n)
+    if grain == "month":
+        months = start.year * 12 + start.month - 1 + n
+        return date(months // 12, months % 12 + 1, 1)
+    if grain == "year":
+        return start.replace(year=start.year + n)
+    return start + timedelta(days=n)
+
+
+def buckets(date_from: date, date_to: date, grain: str) -> list[date]:
+    """Bucket starts covering [date_from, date_to]."""
+    first = period_start(date_from, grain)
+    # counted rather than stepped past date_to, which may be date.max
+    return [shift(first, grain, i) for i in range(bucket_count(date_from, date_to, grain))]
+
+
+def bucket_count(date_from: date, date_to: date, grain: str) -> int:
+    first, last = period_start(date_from, grain), period_start(date_to, grain)
+    if grain == "month":
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    if grain == "year":
+        return last.year - first.year + 1
+    return (last - first).days // (7 if grain == "week" else 1) + 1
+
+
+def previous_range(date_from: date, date_to: date, grain: str) -> tuple[date, date]:
+    """The range compared against [date_from, date_to].
+
+    A range made of whole buckets is compared with the same number of whole
+    buckets before it (February against January, 2025 against 2024); any
+    other range with the same number of days ending the day before it.
+    Raises OverflowError or ValueError when that range leaves the calendar.
+    """
+    after = date_to + timedelta(days=1)
+    if period_start(date_from, grain) == date_from and period_start(after, grain) == after:
+        n = bucket_count(date_from, date_to, grain)
+        return shift(date_from, grain, -n), date_from - timedelta(days=1)
+    return date_from - (after - date_from), date_from - timedelta(days=1)
+
+
+def _totals(row, prefix: str = "") -> dict:
+    def get(name):
+        return row[prefix + name] if row is not None else 0
+
+    return {
+        "sessions": get("sessions"),
+        "minutes": get("minutes"),
+        "volume": round(get("volume"), 2),
+        "avg_performance": (
+            round(get("performance_sum") / get("performance_count"), 2)
+            if get("performance_count") else None
+        ),
+        "avg_feeling": (
+            round(get("feeling_sum") / get("feeling_count"), 2)
+            if get("feeling_count") else None
+        ),
+    }
+
+
+def _delta(current: dict, previous: dict) -> dict:
+    delta = {}
+    for name, value in current.items():
+        before = previous[name]
+        if value is None or before is None:
+            delta[name] = {"change": None, "pct": None}
+            continue
+        change = round(value - before, 2)
+        delta[name] = {"change": change, "pct": round(change / before * 100, 1) if before else None}
+    return delta
+
+
+def compare(conn, date_from: date, date_to: date, grain: str, category: str = "") -> dict:
+    """Totals for [date_from, date_to] per `grain` bucket and overall, with the
+    previous equivalent range's totals and the change against them."""
+    prev_from, prev_to = previous_range(date_from, date_to, grain)
+    where, params = ["day BETWEEN ? AND ?"], [prev_from.isoformat(), date_to.isoformat()]
+    if category:
+        where.append("category = ?")
+        params.append(category)
+    rows = conn.execute(_sql(grain, where), [date_from.isoformat(), *params]).fetchall()
+
+    previous_row = next((r for r in rows if not r["current"]), None)
+    current_rows = [r for r in rows if r["current"]]
+    by_period = {r["period"]: r for r in current_rows}
+    totals = _totals(current_rows[0] if current_rows else None, "total_")
+    previous = _totals(previous_row, "total_")
+    return {
+        "grain": grain,
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "category": category,
+        "previous": {"from": prev_from.isoformat(), "to": prev_to.isoformat()},
+        "totals": totals,
+        "previous_totals": previous,
+        "delta": _delta(totals, previous),
+        "periods": [
+            {"period": start.isoformat(), **_totals(by_period.get(start.isoformat()))}
+            for start in buckets(date_from, date_to, grain)
+        ],
+    }
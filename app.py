@@ -1,106 +1,15 @@
 from flask import Flask, render_template, Blueprint, request, redirect, url_for
-import sqlite3
-from pathlib import Path
 from datetime import date
+from pathlib import Path
 
-app = Flask(__name__)
-app.url_map.strict_slashes = False
-
-DB_PATH = Path(__file__).with_name("trainsphere.db")
-
-
-def get_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def init_db() -> None:
-    with get_db() as connecion:
-        cur = connecion.cursor()
-
-        # PROFILE
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS profile (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            age INTEGER,
-            height_cm INTEGER,
-            weight_kg REAL,
-            goal_text TEXT,
-            goal_weight_kg REAL,
-            quick_notes_json TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-
-        # keep existing DBs working
-        profile_cols = [r[1] for r in cur.execute("PRAGMA table_info(profile)").fetchall()]
-        if "quick_notes_json" not in profile_cols:
-            cur.execute("ALTER TABLE profile ADD COLUMN quick_notes_json TEXT")
-
-        # PLANS
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS custom_plan (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            workout_type TEXT NOT NULL,
-            frequency_per_week INTEGER NOT NULL,
-            goal_type TEXT NOT NULL,
-            goal_value INTEGER NOT NULL,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-
-        # GOALS - Home page
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS goals (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            metric TEXT NOT NULL,
-            target_value INTEGER NOT NULL,
-            target_unit TEXT NOT NULL,
-            target_date TEXT,
-            note TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-
-        # Progress page
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS workouts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            workout_date TEXT DEFAULT CURRENT_DATE,
-            workout_type TEXT NOT NULL,
-            category TEXT,
-            duration_minutes INTEGER,
-            performance_rating INTEGER,
-            feeling_rating INTEGER,
-            notes TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-
-        # keep existing DBs working
-        cols = [r[1] for r in cur.execute("PRAGMA table_info(workouts)").fetchall()]
-        if "category" not in cols:
-            cur.execute("ALTER TABLE workouts ADD COLUMN category TEXT")
-
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS workout_exercises (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            workout_id INTEGER NOT NULL,
-            exercise_name TEXT NOT NULL,
-            sets INTEGER,
-            reps INTEGER,
-            weight_kg REAL,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (workout_id) REFERENCES workouts(id)
-        )
-        """)
-
-        connecion.commit()
-
-
-init_db()
+from jinja2 import FileSystemBytecodeCache
+
+import db
+import goals
+import metrics
+import migrations
+import slowlog
+from db import get_db
 
 main = Blueprint("main", __name__)
 
@@ -119,13 +28,11 @@ def index():
             target_value = 0
 
         if target_value > 0 and metric and unit:
-            with get_db() as conn:
-                conn.execute(
-                    """INSERT INTO goals (metric, target_value, target_unit, target_date, note)
-                       VALUES (?, ?, ?, ?, ?)""",
-                    (metric, target_value, unit, tdate, note),
-                )
-                conn.commit()
+            db.run_write(lambda conn: conn.execute(
+                """INSERT INTO goals (metric, target_value, target_unit, target_date, note)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (metric, target_value, unit, tdate, note),
+            ))
 
         return redirect(url_for("main.index"))
 
@@ -137,6 +44,7 @@ def index():
         recent_goals = conn.execute(
             "SELECT * FROM goals ORDER BY id DESC LIMIT 5"
         ).fetchall()
+        goal_progress = goals.current(conn)
 
     return render_template(
         "index.html",
@@ -144,20 +52,17 @@ def index():
         now_date=date.today().strftime("%d/%m/%Y"),
         steps_goal=steps_goal,
         recent_goals=recent_goals,
+        goal_progress=goal_progress,
     )
 
 
 # ✅ NEW: delete goal
 @main.route("/goals/delete/<int:goal_id>", methods=["POST"])
 def delete_goal(goal_id: int):
-    with get_db() as conn:
-        conn.execute("DELETE FROM goals WHERE id = ?", (goal_id,))
-        conn.commit()
+    db.run_write(lambda conn: conn.execute("DELETE FROM goals WHERE id = ?", (goal_id,)))
     return redirect(url_for("main.index"))
 
 
-app.register_blueprint(main)
-
 # Blueprints
 from routes.profile import profile_bp
 from routes.plans import plans_bp
@@ -165,11 +70,45 @@ from routes.progress import progress_bp
 from routes.motivation import motivation_bp
 from routes.report import report_bp
 
-app.register_blueprint(profile_bp)
-app.register_blueprint(plans_bp)
-app.register_blueprint(progress_bp)
-app.register_blueprint(motivation_bp)
-app.register_blueprint(report_bp)
+
+def create_app(config: dict | None = None) -> Flask:
+    """Build the app. Settings come from TRAINSPHERE_* environment variables
+    (e.g. TRAINSPHERE_DATABASE=/srv/trainsphere.db), then from `config`.
+
+    The only database work done here is the schema check, and its connection
+    is closed before returning, so a preforking server can create the app
+    once and fork workers from it (see gunicorn.conf.py).
+    """
+    app = Flask(__name__)
+    app.url_map.strict_slashes = False
+    app.config.from_prefixed_env("TRAINSPHERE")
+    app.config.from_mapping(config or {})
+
+    # compiled templates survive restarts, so fresh workers skip the Jinja compile
+    cache_dir = app.config.get("JINJA_CACHE_DIR", Path(app.root_path) / "jinja_cache")
+    if cache_dir:
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(str(cache_dir))
+
+    db.init_app(app)
+    goals.init_app(app)
+    metrics.init_app(app)
+    slowlog.init_app(app)
+    migrations.init_app(app)
+
+    app.register_blueprint(main)
+    app.register_blueprint(profile_bp)
+    app.register_blueprint(plans_bp)
+    app.register_blueprint(progress_bp)
+    app.register_blueprint(motivation_bp)
+    app.register_blueprint(report_bp)
+
+    if app.config.get("CHECK_SCHEMA_ON_START", True):
+        migrations.ensure_current(app)
+        db.close_all()
+    return app
+
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    # development server only; production runs wsgi:app under gunicorn
+    create_app({"DEBUG": True}).run()
@@ -0,0 +1,75 @@
+"""Import-time budget for the app module.
+
+Runs `python -X importtime -c "import app"` a few times in fresh interpreters
+and reports the median cumulative import cost of `app` with and without the
+report blueprint (app minus routes.report). Exits 1 if either number is over
+budget or if reportlab was imported eagerly.
+
+    python bench/import_budget.py --budget-ms 600 --without-report-ms 500
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BUDGET_MS = 600.0
+WITHOUT_REPORT_MS = 500.0
+
+
+def _cumulative_us(stderr: str, module: str) -> int:
+    # line format: "import time: self [us] | cumulative | imported package"
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.strip() == module:
+            return int(cumulative)
+    return 0
+
+
+def measure(runs: int) -> dict:
+    with_report, report_only = [], []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c",
+             "import sys, app; sys.exit('reportlab' in sys.modules)"],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        if proc.returncode == 1:
+            raise SystemExit("reportlab was imported while importing app (expected lazy)")
+        if proc.returncode != 0:
+            raise SystemExit(proc.stderr)
+        with_report.append(_cumulative_us(proc.stderr, "app"))
+        report_only.append(_cumulative_us(proc.stderr, "routes.report"))
+
+    app_ms = statistics.median(with_report) / 1000
+    report_ms = statistics.median(report_only) / 1000
+    return {"app_ms": app_ms, "report_ms": report_ms, "without_report_ms": app_ms - report_ms}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS,
+                        help="budget for importing app with every blueprint")
+    parser.add_argument("--without-report-ms", type=float, default=WITHOUT_REPORT_MS,
+                        help="budget for importing app minus the report blueprint")
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    print(f"app import:            {result['app_ms']:.1f} ms (budget {args.budget_ms:.0f})")
+    print(f"  routes.report:       {result['report_ms']:.1f} ms")
+    print(f"  without report:      {result['without_report_ms']:.1f} ms "
+          f"(budget {args.without_report_ms:.0f})")
+
+    over = (
+        result["app_ms"] > args.budget_ms
+        or result["without_report_ms"] > args.without_report_ms
+    )
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+"""Data-scale benchmark: route latency, SQL statements and peak memory.
+
+Builds a deterministic synthetic history at each scale (profile, plans, goals,
+workouts, exercise rows, then every derived table via the registered
+rebuilders), times each route through the Flask test client, and writes the
+results as JSON. With --compare it checks a run against an earlier baseline
+and exits 1 on a regression.
+
+    python bench/scale.py --scales 10000,100000 --out baseline.json
+    python bench/scale.py --scales 10000,100000 --compare baseline.json
+    python bench/scale.py --scales 1000000 --data-dir /var/tmp/ts-bench --iterations 5
+
+Generated databases are reused from --data-dir when present; the benchmark
+only issues reads, so a file stays valid across runs.
+"""
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import catalog  # noqa: E402
+import db  # noqa: E402
+import migrations  # noqa: E402
+
+END_DATE = date(2025, 12, 31)
+HISTORY_DAYS = 10 * 365
+NOTE_WORDS = (
+    "felt strong tired sore shoulder knee easy hard tempo focus form deload "
+    "new pr slow fast heavy light great rough warmup cooldown grip"
+).split()
+
+
+# -- synthetic data ---------------------------------------------------------
+
+def generate(path: Path, workouts: int, seed: int) -> None:
+    """Fill a fresh database at `path` with `workouts` workouts and their exercises."""
+    from routes.progress import WORKOUT_TEMPLATES, _derive_category
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    migrations.upgrade(conn)
+
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute(
+        """INSERT INTO profile (name, age, height_cm, weight_kg, goal_text, goal_weight_kg,
+                                quick_notes_json)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        ("Bench User", 34, 178, 81.5, "Get stronger", 78.0, json.dumps(["hydrate", "sleep 8h"])),
+    )
+    conn.executemany(
+        """INSERT INTO custom_plan (workout_type, frequency_per_week, goal_type, goal_value,
+                                    checklist_json)
+           VALUES (?, ?, ?, ?, ?)""",
+        [(t, rng.randint(1, 5), "sessions", rng.randint(2, 6), json.dumps(["warm up"]))
+         for t in WORKOUT_TEMPLATES],
+    )
+    conn.executemany(
+        "INSERT INTO goals (metric, target_value, target_unit, target_date, note) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [("steps", 10000, "steps/day", None, ""), ("water", 2500, "ml/day", None, ""),
+         ("calories", 2200, "kcal/day", None, "")],
+    )
+
+    types = list(WORKOUT_TEMPLATES)
+    exercise_ids = catalog.resolve(
+        conn, [ex["name"] for template in WORKOUT_TEMPLATES.values() for ex in template]
+    )
+    batch: list[tuple] = []
+    exercise_rows: list[tuple] = []
+
+    def flush():
+        conn.executemany(
+            """INSERT INTO workouts (id, workout_date, workout_type, category, duration_minutes,
+                                     performance_rating, feeling_rating, notes)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            batch,
+        )
+        conn.executemany(
+            "INSERT INTO workout_exercises (workout_id, exercise_id, sets, reps, weight_kg) "
+            "VALUES (?, ?, ?, ?, ?)",
+            exercise_rows,
+        )
+        batch.clear()
+        exercise_rows.clear()
+
+    for workout_id in range(1, workouts + 1):
+        workout_type = rng.choice(types)
+        day = END_DATE - timedelta(days=rng.randrange(HISTORY_DAYS))
+        notes = " ".join(rng.choices(NOTE_WORDS, k=rng.randint(0, 8)))
+        batch.append((
+            workout_id, day.isoformat(), workout_type, _derive_category(workout_type),
+            rng.randint(15, 90), rng.randint(1, 10), rng.randint(1, 10), notes,
+        ))
+        template: list[dict[str, Any]] = WORKOUT_TEMPLATES[workout_type]
+        for ex in template:
+            exercise_rows.append((
+                workout_id, exercise_ids[ex["name"]], ex["sets"],
+                max(1, ex["reps"] + rng.randint(-3, 3)),
+                round(ex["weight_kg"] * rng.uniform(0.8, 1.4), 1) if ex["weight_kg"] else 0,
+            ))
+        if len(batch) >= 10000:
+            flush()
+    flush()
+
+    for rebuild in db.REBUILDERS.values():
+        rebuild(conn)
+    conn.commit()
+    conn.execute("PRAGMA optimize")
+    conn.close()
+
+
+def dataset(data_dir: Path, workouts: int, seed: int) -> Path:
+    path = data_dir / f"synthetic-{workouts}-seed{seed}.db"
+    if not path.exists():
+        started = time.perf_counter()
+        tmp = path.with_suffix(".partial")
+        for leftover in data_dir.glob(tmp.name + "*"):
+            leftover.unlink()
+        generate(tmp, workouts, seed)
+        tmp.rename(path)
+        print(f"generated {workouts} workouts in {time.perf_counter() - started:.1f}s -> {path}",
+              file=sys.stderr)
+    return path
+
+
+# -- instrumentation ---------------------------------------------------------
+
+_statements = [0]
+
+
+def _install_statement_counter() -> None:
+    # db.Connection already counts statements per borrow through its trace
+    # callback; chaining onto it totals them across connections as well
+    on_statement = db.Connection._on_statement
+
+    def counting(conn, sql):
+        on_statement(conn, sql)
+        if not sql.startswith("-- ") and not conn.untraced:
+            _statements[0] += 1
+
+    setattr(db.Connection, "_on_statement", counting)
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    # nearest-rank, so small samples report a value that was actually observed
+    rank = max(1, round(pct / 100 * len(sorted_values) + 0.5))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _summary(samples_ms: list[float]) -> dict:
+    ordered = sorted(samples_ms)
+    return {
+        "n": len(ordered),
+        "min_ms": round(ordered[0], 3),
+        "mean_ms": round(sum(ordered) / len(ordered), 3),
+        "p50_ms": round(_percentile(ordered, 50), 3),
+        "p90_ms": round(_percentile(ordered, 90), 3),
+        "p99_ms": round(_percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+# -- cases ---------------------------------------------------------------------
+
+def cases(app, conn) -> list[tuple]:
+    """(name, fn) pairs; each fn performs one complete request or call."""
+    from routes.progress import _encode_cursor
+    from routes.report import fetch_report
+
+    client = app.test_client()
+    report_cache = app.extensions["report_cache"]
+    total = conn.execute("SELECT COUNT(*) FROM workouts").fetchone()[0]
+    middle = conn.execute(
+        "SELECT workout_date, id FROM workouts "
+        "ORDER BY workout_date DESC, id DESC LIMIT 1 OFFSET ?",
+        (total // 2,),
+    ).fetchone()
+    year_from = (END_DATE - timedelta(days=364)).isoformat()
+    year_to = END_DATE.isoformat()
+
+    def get(url, uncached=False):
+        def run():
+            if uncached:
+                report_cache.clear()
+            response = client.get(url)
+            response.get_data()
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {url} -> {response.status_code}")
+        return run
+
+    def call(fn, *args):
+        def run():
+            with app.app_context():
+                fn(*args)
+        return run
+
+    year = f"from={year_from}&to={year_to}"
+    return [
+        ("home", get("/")),
+        ("progress_page", get("/progress?period=all")),
+        ("api_workouts_first_page", get("/progress/api/workouts?limit=50")),
+        ("api_workouts_deep_page",
+         get(f"/progress/api/workouts?limit=50&cursor={_encode_cursor(middle)}")),
+        ("api_rollups_week_1y", get(f"/progress/api/rollups?grain=week&{year}")),
+        ("records_page", get("/progress/records")),
+        ("search", get("/progress/search?q=squats")),
+        ("export_csv", get("/report/export?format=csv", uncached=True)),
+        ("export_pdf", get("/report/export?format=pdf", uncached=True)),
+        ("export_csv_cached", get("/report/export?format=csv")),
+        ("history_csv_stream_1y", get(f"/report/export?format=csv&stream=1&{year}")),
+        ("fetch_report_20", call(fetch_report, 20)),
+        ("fetch_report_all", call(fetch_report, None)),
+    ]
+
+
+def measure(fn, iterations: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    result = _summary(samples)
+
+    # one more run, untimed, for statement count and Python heap peak
+    _statements[0] = 0
+    tracemalloc.start()
+    fn()
+    result["peak_kib"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    tracemalloc.stop()
+    result["statements"] = _statements[0]
+    return result
+
+
+def run(
+    scales: list[int], seed: int, iterations: int, warmup: int, data_dir: Path, only: set
+) -> dict:
+    paths = {n: dataset(data_dir, n, seed) for n in scales}
+
+    _install_statement_counter()
+    from app import create_app
+
+    results: dict[str, dict] = {}
+    for n in scales:
+        app = create_app({"DATABASE": str(paths[n]), "REPORT_SPOOL_DIR": str(data_dir / "spool")})
+        results[str(n)] = {}
+        with app.app_context():
+            scale_cases = cases(app, db.get_db())
+        for name, fn in scale_cases:
+            if only and name not in only:
+                continue
+            results[str(n)][name] = measure(fn, iterations, warmup)
+            r = results[str(n)][name]
+            print(f"{n:>9} {name:<26} p50 {r['p50_ms']:>9.2f} ms  p99 {r['p99_ms']:>9.2f} ms  "
+                  f"{r['statements']:>4} stmts  {r['peak_kib']:>10.1f} KiB", file=sys.stderr)
+    db.close_all()
+
+    return {
+        "meta": {
+            "seed": seed,
+            "iterations": iterations,
+            "warmup": warmup,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+# -- regression check --------------------------------------------------------
+
+def compare(
+    current: dict, baseline: dict, tolerance: float, min_ms: float, min_kib: float
+) -> list[str]:
+    """Regressions of `current` against `baseline` as readable lines.
+
+    Latency (p50) and peak memory may grow by `tolerance` (a fraction) plus an
+    absolute floor so tiny cases don't flap; statement counts are
+    deterministic, so any increase is reported.
+    """
+    problems = []
+    for scale, base_cases in baseline["results"].items():
+        for name, base in base_cases.items():
+            cur = current["results"].get(scale, {}).get(name)
+            if cur is None:
+                continue
+            label = f"{scale} {name}"
+            slower = cur["p50_ms"] - base["p50_ms"]
+            if cur["p50_ms"] > base["p50_ms"] * (1 + tolerance) and slower > min_ms:
+                problems.append(f"{label}: p50 {base['p50_ms']:.2f} -> {cur['p50_ms']:.2f} ms")
+            if cur["statements"] > base["statements"]:
+                problems.append(f"{label}: statements {base['statements']} -> {cur['statements']}")
+            grown = cur["peak_kib"] - base["peak_kib"]
+            if cur["peak_kib"] > base["peak_kib"] * (1 + tolerance) and grown > min_kib:
+                problems.append(
+                    f"{label}: peak {base['peak_kib']:.0f} -> {cur['peak_kib']:.0f} KiB"
+                )
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="10000,100000",
+                        help="comma-separated workout counts")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--cases", default="", help="comma-separated case names (default: all)")
+    parser.add_argument("--data-dir", type=Path, default=None,
+                        help="where generated databases are kept (default: a temp dir)")
+    parser.add_argument("--out", type=Path, help="write the results JSON here")
+    parser.add_argument("--compare", type=Path, help="baseline JSON to check against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative growth of p50 latency and peak memory")
+    parser.add_argument("--min-ms", type=float, default=2.0,
+                        help="ignore latency growth smaller than this")
+    parser.add_argument("--min-kib", type=float, default=256.0,
+                        help="ignore memory growth smaller than this")
+    args = parser.parse_args()
+
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    only = {c.strip() for c in args.cases.split(",") if c.strip()}
+    with tempfile.TemporaryDirectory(prefix="trainsphere-bench-") as tmp:
+        data_dir = args.data_dir or Path(tmp)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        current = run(scales, args.seed, args.iterations, args.warmup, data_dir, only)
+
+    if args.out:
+        args.out.write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+    else:
+        json.dump(current, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        problems = compare(current, baseline, args.tolerance, args.min_ms, args.min_kib)
+        for line in problems:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if problems:
+            return 1
+        print("no regressions against baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
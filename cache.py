@@ -0,0 +1,72 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe LRU map bounded by total size (bytes) and/or entry count.
+
+    `sizeof` measures a value (default: 1 per entry). A bound left as None is
+    not enforced.
+    """
+
+    def __init__(
+        self, max_bytes: int | None = None, max_entries: int | None = None, sizeof=None
+    ):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._sizeof = sizeof or (lambda _value: 1)
+        self._data: OrderedDict = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, _size = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._size -= self._data.pop(key)[1]
+            if self.max_bytes is not None and size > self.max_bytes:
+                return  # would evict everything else and still not fit
+            self._data[key] = (value, size)
+            self._size += size
+            while (self.max_bytes is not None and self._size > self.max_bytes) or (
+                self.max_entries is not None and len(self._data) > self.max_entries
+            ):
+                _key, (_value, old_size) = self._data.popitem(last=False)
+                self._size -= old_size
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            value, size = self._data.pop(key)
+            self._size -= size
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,70 @@
+import threading
+
+import db
+
+# The exercises table interns exercise names: workout_exercises stores an
+# integer exercise_id instead of repeating the name on every row. Names that
+# differ only in case or spacing share one entry (see exercise_key()), shown
+# under the spelling that was saved first.
+#
+# Entries are never deleted or renamed, so a key -> id mapping read from the
+# database stays valid for the life of the process and is cached here, per
+# database file.
+_lock = threading.Lock()
+_ids: dict = {}
+
+
+def exercise_key(name: str | None) -> str:
+    """Case- and whitespace-insensitive grouping key for an exercise name."""
+    return " ".join((name or "").split()).casefold()
+
+
+def display_name(name: str | None) -> str:
+    return " ".join((name or "").split())
+
+
+def _cache() -> dict:
+    with _lock:
+        return _ids.setdefault(str(db.DB_PATH), {})
+
+
+def resolve(conn, names) -> dict:
+    """{name: exercise_id} for `names`, adding unknown exercises to the catalogue.
+
+    Cached names cost nothing; the rest take one lookup for the whole batch
+    plus one insert per exercise never seen before. Must run inside the
+    caller's write transaction.
+    """
+    cache = _cache()
+    keys = {name: exercise_key(name) for name in names}
+    missing: dict[str, str] = {}
+    for name, key in keys.items():
+        if key not in cache:
+            missing.setdefault(key, display_name(name))
+    if not missing:
+        return {name: cache[key] for name, key in keys.items()}
+
+    found = {}
+    key_list = list(missing)
+    # chunked to stay under SQLite's bound-variable limit
+    for i in range(0, len(key_list), 500):
+        chunk = key_list[i:i + 500]
+        for key, exercise_id in conn.execute(
+            f"SELECT key, id FROM exercises WHERE key IN ({','.join(['?'] * len(chunk))})",
+            chunk,
+        ).fetchall():
+            found[key] = exercise_id
+    with _lock:
+        cache.update(found)
+    for key, name in missing.items():
+        if key not in found:
+            # left out of the cache: the row only exists once the caller commits
+            found[key] = conn.execute(
+                "INSERT INTO exercises (key, name) VALUES (?, ?)", (key, name)
+            ).lastrowid
+    return {name: found.get(key) or cache[key] for name, key in keys.items()}
+
+
+def clear_cache() -> None:
+    with _lock:
+        _ids.clear()
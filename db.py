@@ -0,0 +1,444 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+from flask import g, has_app_context
+
+import slowlog
+
+DB_PATH = Path(__file__).with_name("trainsphere.db")
+
+# Applied once per physical connection, not per request.
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("mmap_size", 256 * 1024 * 1024),
+    ("cache_size", -16000),  # negative = KiB, so ~16 MB page cache
+    ("busy_timeout", 5000),
+    ("temp_store", "MEMORY"),
+)
+
+POOL_SIZE = 8
+
+# most queued writes folded into one group commit
+WRITE_BATCH_MAX = 64
+
+# statements slower than this go to the slow-query log; None turns it off
+SLOW_QUERY_SECONDS: float | None = 0.1
+
+# name -> (sql, sample params); checked by `flask db check-plans`
+HOT_QUERIES: dict[str, tuple[str, tuple]] = {}
+
+# name -> fn(conn) that recomputes a derived table; run by `flask db rebuild`
+REBUILDERS: dict = {}
+
+_lock = threading.Lock()
+_idle: list["Connection"] = []
+_local = threading.local()
+_stats = {"opened": 0, "reused": 0, "released": 0, "closed": 0, "in_use": 0}
+
+
+class Cursor(sqlite3.Cursor):
+    """Adds the wall time of every execute and fetch to connection.sql_seconds.
+
+    The time is also summed per statement; once a statement passes
+    SLOW_QUERY_SECONDS it goes to the slow-query log (slowlog.py).
+    """
+
+    _statement = None  # (sql, params, many) of the last execute
+    _statement_seconds = 0.0
+    _slow_entry = None
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(self, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.connection.sql_seconds += elapsed
+            self._statement_seconds += elapsed
+            if SLOW_QUERY_SECONDS is not None and self._statement_seconds >= SLOW_QUERY_SECONDS:
+                self._log_slow()
+
+    def _start(self, sql, params, many):
+        self._statement = (sql, params, many)
+        self._statement_seconds = 0.0
+        self._slow_entry = None
+
+    def _log_slow(self):
+        if self._statement is None:
+            return
+        sql, params, many = self._statement
+        conn = self.connection
+
+        def _plan_for():
+            sample = (params[0] if params else ()) if many else params
+            conn.untraced = True
+            try:
+                return [r[3] for r in sqlite3.Connection.execute(
+                    conn, "EXPLAIN QUERY PLAN " + sql, sample
+                ).fetchall()]
+            except sqlite3.Error as exc:
+                return [f"EXPLAIN failed: {exc}"]
+            finally:
+                conn.untraced = False
+
+        self._slow_entry = slowlog.record(
+            sql, params, many, self._statement_seconds, _plan_for, self._slow_entry
+        )
+
+    def execute(self, sql, params=(), /):
+        self._start(sql, params, False)
+        return self._timed(sqlite3.Cursor.execute, sql, params)
+
+    def executemany(self, sql, seq_of_params, /):
+        # materialized so the slow log can report the batch size
+        if not isinstance(seq_of_params, (list, tuple)):
+            seq_of_params = list(seq_of_params)
+        self._start(sql, seq_of_params, True)
+        return self._timed(sqlite3.Cursor.executemany, sql, seq_of_params)
+
+    def fetchone(self):
+        return self._timed(sqlite3.Cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed(sqlite3.Cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed(sqlite3.Cursor.fetchall)
+
+    def __next__(self):
+        return self._timed(sqlite3.Cursor.__next__)
+
+
+class Connection(sqlite3.Connection):
+    """sqlite3 connection that keeps per-borrow query counters.
+
+    `queries` is counted by the trace callback, so it sees COMMITs and other
+    statements sqlite3 issues on its own; statements nested inside triggers or
+    virtual tables are left out. `sql_seconds` is measured by Cursor.
+    Both are reset each time the pool hands the connection out.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.untraced = False  # set while the slow log runs its EXPLAIN
+        self.set_trace_callback(self._on_statement)
+
+    def _on_statement(self, sql: str) -> None:
+        if not sql.startswith("-- ") and not self.untraced:
+            self.queries += 1
+
+    def reset_counters(self) -> None:
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+    # sqlite3.Connection.execute* bypass an overridden cursor(), so route
+    # them through it explicitly
+    def cursor(self, factory=Cursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+
+def _connect(readonly: bool = True) -> Connection:
+    # Pooled request connections are read-only (mode=ro); under WAL they read
+    # concurrently with the single writer connection (see run_write).
+    target = Path(DB_PATH).resolve().as_uri() + "?mode=ro" if readonly else DB_PATH
+    conn = sqlite3.connect(target, uri=readonly, check_same_thread=False, factory=Connection)
+    conn.row_factory = sqlite3.Row
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def _acquire() -> Connection:
+    with _lock:
+        conn = _idle.pop() if _idle else None
+        if conn is not None:
+            _stats["reused"] += 1
+        _stats["in_use"] += 1
+    if conn is None:
+        conn = _connect()
+        with _lock:
+            _stats["opened"] += 1
+    conn.reset_counters()
+    return conn
+
+
+def _release(conn: Connection) -> None:
+    # never hand a half-finished transaction to the next request
+    if conn.in_transaction:
+        conn.rollback()
+    with _lock:
+        _stats["in_use"] -= 1
+        _stats["released"] += 1
+        if len(_idle) < POOL_SIZE:
+            _idle.append(conn)
+            return
+        _stats["closed"] += 1
+    conn.close()
+
+
+def get_db() -> sqlite3.Connection:
+    """Return the read-only connection bound to the current request (or thread).
+
+    Inside a request the connection is borrowed from the pool on first use and
+    given back in the teardown handler. Outside of one (CLI commands, background
+    threads) it is kept per thread until close_db() is called. Writes go
+    through run_write().
+    """
+    if has_app_context():
+        if "db" not in g:
+            g.db = _acquire()
+        return g.db
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _acquire()
+    return conn
+
+
+def close_db(_exc=None) -> None:
+    if has_app_context():
+        conn = g.pop("db", None)
+    else:
+        conn = getattr(_local, "conn", None)
+        _local.conn = None
+    if conn is not None:
+        _release(conn)
+
+
+def close_all() -> None:
+    with _lock:
+        conns = list(_idle)
+        _idle.clear()
+        _stats["closed"] += len(conns)
+    for conn in conns:
+        conn.close()
+
+
+def connect_writer() -> sqlite3.Connection:
+    """A private read-write connection, for work that manages its own
+    transactions outside the writer thread (schema migrations)."""
+    return _connect(readonly=False)
+
+
+class _Writer:
+    """The process's single write connection and the thread that owns it.
+
+    Callers queue fn(conn) jobs. The thread takes everything queued so far (up
+    to WRITE_BATCH_MAX), runs each job inside its own SAVEPOINT within one
+    BEGIN IMMEDIATE transaction and commits once for the whole group, so N
+    concurrent writers cost one lock acquisition and one WAL sync instead of
+    N competing transactions. A job that raises is rolled back to its
+    savepoint without affecting the others.
+
+    A job that runs alone, because nothing else was queued or because it was
+    submitted with alone=True, skips the savepoint: with one open, SQLite opens
+    a statement savepoint for every row a trigger writes, which makes large
+    batches (imports) several times slower.
+    """
+
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.conn = connect_writer()
+        self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, fn, alone: bool = False) -> Future:
+        future: Future = Future()
+        self.queue.put((fn, future, alone))
+        return future
+
+    def stop(self) -> None:
+        self.queue.put(None)
+        self.thread.join(timeout=10)
+
+    def _run(self) -> None:
+        pending = None
+        while True:
+            job, pending = pending or self.queue.get(), None
+            if job is None:
+                break
+            batch = [job]
+            stopping = False
+            while not job[2] and len(batch) < WRITE_BATCH_MAX:
+                try:
+                    job = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                if job[2]:  # gets a transaction of its own, after this group
+                    pending = job
+                    break
+                batch.append(job)
+            self._commit_group(batch)
+            if stopping:
+                if pending:
+                    self._commit_group([pending])
+                break
+        self.conn.close()
+
+    def _commit_group(self, batch: list) -> None:
+        conn = self.conn
+        results = []
+        grouped = len(batch) > 1
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, future, _alone in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                queries, seconds = conn.queries, conn.sql_seconds
+                if grouped:
+                    conn.execute("SAVEPOINT job")
+                try:
+                    result = fn(conn)
+                except Exception as exc:
+                    if not grouped:
+                        conn.rollback()
+                        future.set_exception(exc)
+                        return
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    future.set_exception(exc)
+                    continue
+                if grouped:
+                    conn.execute("RELEASE job")
+                results.append((future, result, conn.queries - queries, conn.sql_seconds - seconds))
+            conn.commit()
+        except Exception as exc:  # BEGIN or COMMIT failed: nothing in the group was written
+            if conn.in_transaction:
+                conn.rollback()
+            for _fn, future, _alone in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for future, result, queries, seconds in results:
+            future.set_result((result, queries, seconds))
+
+
+_writer: _Writer | None = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer() -> _Writer:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = _Writer()
+        return _writer
+
+
+def run_write(fn, alone: bool = False):
+    """Run fn(conn) on the write connection and return its result.
+
+    Blocks until the group commit containing the job is durable. fn must not
+    commit or roll back; it is rolled back alone if it raises, and the
+    exception is re-raised here. alone=True commits it in a transaction of
+    its own, for large jobs such as import batches.
+    """
+    writer = _get_writer()
+    if threading.current_thread() is writer.thread:  # nested call from a job
+        return fn(writer.conn)
+    result, queries, seconds = writer.submit(fn, alone).result()
+    if has_app_context():
+        # picked up by metrics.py alongside the read connection's counters
+        g.write_queries = g.get("write_queries", 0) + queries
+        g.write_sql_seconds = g.get("write_sql_seconds", 0.0) + seconds
+    return result
+
+
+def stop_writer() -> None:
+    """Finish the queued writes and close the write connection."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+
+
+atexit.register(close_all)
+atexit.register(stop_writer)
+
+
+# Connections inherited across a fork. They are kept referenced and never
+# touched: closing one in the child could checkpoint and remove the WAL while
+# the parent still uses it.
+_inherited: list = []
+
+
+def _after_fork_in_child() -> None:
+    # A SQLite connection must not be used on both sides of a fork, so the
+    # child starts with an empty pool.
+    global _lock, _idle, _local, _writer, _writer_lock
+    _inherited.extend(_idle)
+    if getattr(_local, "conn", None) is not None:
+        _inherited.append(_local.conn)
+    if _writer is not None:  # its thread did not survive the fork
+        _inherited.append(_writer.conn)
+    _lock = threading.Lock()
+    _idle = []
+    _local = threading.local()
+    _writer = None
+    _writer_lock = threading.Lock()
+    for key in _stats:
+        _stats[key] = 0
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def pool_stats() -> dict:
+    with _lock:
+        return {**_stats, "idle": len(_idle), "pool_size": POOL_SIZE}
+
+
+def data_version(conn: sqlite3.Connection) -> int:
+    """Counter bumped by triggers on every write to the report tables and goals
+    (migrations 5 and 12)."""
+    return conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()[0]
+
+
+def register_hot_query(name: str, sql: str, params=()) -> None:
+    HOT_QUERIES[name] = (sql, tuple(params))
+
+
+def register_rebuilder(name: str, fn) -> None:
+    REBUILDERS[name] = fn
+
+
+def explain(conn: sqlite3.Connection, sql: str, params=()) -> list[str]:
+    return [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, tuple(params)).fetchall()]
+
+
+def plan_problems(details: list[str]) -> list[str]:
+    """Plan steps that mean a full table scan or an unindexed sort."""
+    return [
+        d for d in details
+        if (d.startswith("SCAN ") and " USING " not in d) or "TEMP B-TREE" in d
+    ]
+
+
+def init_app(app) -> None:
+    global DB_PATH, POOL_SIZE
+    path = Path(app.config.get("DATABASE", DB_PATH))
+    if path != DB_PATH:
+        # idle connections and the writer still point at the old file
+        close_all()
+        stop_writer()
+    DB_PATH = path
+    POOL_SIZE = int(app.config.get("DB_POOL_SIZE", POOL_SIZE))
+    app.teardown_appcontext(close_db)
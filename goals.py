@@ -0,0 +1,136 @@
+import math
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from itertools import accumulate
+
+from flask import current_app
+
+import db
+from cache import LRUCache
+
+# Goals on workout metrics are measured against rollup_daily. steps, water
+# and calories goals are stored too, but nothing records those yet, so they
+# are listed without progress.
+METRICS = {
+    "minutes": "minutes",  # goal metric -> rollup_daily column
+    "sessions": "sessions",
+    "volume": "volume",
+}
+
+# "<x>/day" and "<x>/week" goals count the current day or ISO week until their
+# target date; any other unit accumulates from the day the goal was set until it.
+PERIOD_DAYS = {"day": 1, "week": 7}
+
+_DAILY_TOTALS_SQL = """
+    SELECT day, SUM(sessions) AS sessions, SUM(minutes) AS minutes, SUM(volume) AS volume
+    FROM rollup_daily
+    WHERE day BETWEEN ? AND ?
+    GROUP BY day
+    ORDER BY day
+"""
+
+
+def _window(goal, today: date) -> tuple[date, date | None]:
+    """(first day counted, deadline or None) of a goal.
+
+    Per-period goals count the current day or week, and still end at their
+    target_date when it comes first.
+    """
+    try:
+        deadline = date.fromisoformat(goal["target_date"]) if goal["target_date"] else None
+    except ValueError:
+        deadline = None
+    period = (goal["target_unit"] or "").rpartition("/")[2]
+    if period in PERIOD_DAYS:
+        start = today - timedelta(days=today.weekday()) if period == "week" else today
+        period_end = start + timedelta(days=PERIOD_DAYS[period] - 1)
+        return start, min(period_end, deadline) if deadline else period_end
+    start = date.fromisoformat((goal["created_at"] or today.isoformat())[:10])
+    return min(start, today), deadline
+
+
+def evaluate(conn, today: date | None = None) -> dict:
+    """Progress of every active goal, {goal id: {...}}.
+
+    Goals whose deadline has passed are left out. One range query reads the
+    daily totals from the earliest goal start to today; prefix sums over them
+    then give each goal's total with two bisections, however many goals there are.
+    """
+    today = today or date.today()
+    goals = []
+    for goal in conn.execute(
+        "SELECT id, metric, target_value, target_unit, target_date, created_at FROM goals"
+    ).fetchall():
+        start, deadline = _window(goal, today)
+        if deadline is None or deadline >= today:
+            goals.append((goal, start, deadline))
+
+    tracked = [g for g in goals if g[0]["metric"] in METRICS]
+    days, prefix = [], {}
+    if tracked:
+        rows = conn.execute(
+            _DAILY_TOTALS_SQL, (min(s for _g, s, _d in tracked).isoformat(), today.isoformat())
+        ).fetchall()
+        days = [r["day"] for r in rows]
+        prefix = {
+            column: [0, *accumulate(r[column] for r in rows)] for column in set(METRICS.values())
+        }
+
+    results = {}
+    for goal, start, deadline in goals:
+        result = {
+            "metric": goal["metric"],
+            "target": goal["target_value"],
+            "unit": goal["target_unit"],
+            "from": start.isoformat(),
+            "deadline": deadline.isoformat() if deadline else None,
+            "tracked": goal["metric"] in METRICS,
+        }
+        results[goal["id"]] = result
+        if not result["tracked"]:
+            continue
+
+        end = min(today, deadline) if deadline else today
+        cum = prefix[METRICS[goal["metric"]]]
+        value = (cum[bisect_right(days, end.isoformat())]
+                 - cum[bisect_left(days, start.isoformat())])
+        target = goal["target_value"]
+        elapsed = (end - start).days + 1
+        done = value >= target
+        projected_date = None
+        if not done and value > 0:
+            # day the target is reached if the pace so far continues
+            projected_date = start + timedelta(days=math.ceil(target * elapsed / value) - 1)
+        result.update({
+            "value": round(value, 1),
+            "pct": round(value / target * 100, 1) if target else None,
+            "done": done,
+            "projected_date": projected_date.isoformat() if projected_date else None,
+            "on_track": (
+                done or (projected_date is not None and projected_date <= deadline)
+                if deadline else None
+            ),
+        })
+    return results
+
+
+def current(conn) -> dict:
+    """evaluate() for today, cached until the next write to any data_version
+    table (goals and workouts included) or the next day."""
+    today = date.today()
+    key = (db.data_version(conn), today)
+    cache = current_app.extensions["goal_progress"]
+    results = cache.get(key)
+    if results is None:
+        results = evaluate(conn, today)
+        cache.put(key, results)
+    return results
+
+
+def init_app(app) -> None:
+    app.extensions["goal_progress"] = LRUCache(max_entries=4)
+
+
+db.register_hot_query(
+    "goals.daily_totals", _DAILY_TOTALS_SQL, ("2024-01-01", "2024-12-31")
+)
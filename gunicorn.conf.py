@@ -0,0 +1,29 @@
+"""Gunicorn settings for TrainSphere.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Tunables (environment variables):
+    WEB_CONCURRENCY  worker processes (default: CPU count, at most 8)
+    WEB_THREADS      threads per worker (default 4)
+    BIND             listen address (default 0.0.0.0:8000)
+    WEB_TIMEOUT      seconds before a stuck worker is restarted (default 60)
+
+Workers are forked from a preloaded app: create_app() runs once in the
+master and each worker starts with an empty connection pool (db.py resets it
+after fork). SQLite in WAL mode serves the readers in parallel; each worker's
+pool needs DB_POOL_SIZE >= WEB_THREADS to avoid opening extra connections.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count(), 8)))
+threads = int(os.environ.get("WEB_THREADS", 4))
+worker_class = "gthread"
+preload_app = True
+timeout = int(os.environ.get("WEB_TIMEOUT", 60))
+graceful_timeout = 30
+# recycle workers now and then so slow leaks can't accumulate
+max_requests = 2000
+max_requests_jitter = 200
+accesslog = "-"
@@ -0,0 +1,221 @@
+"""Bulk workout import from CSV or JSON lines.
+
+CSV uses the flat layout of the full-history export (report.HISTORY_CSV_HEADER):
+one row per exercise, consecutive rows with the same Workout_id form one
+workout. JSON lines carry one workout per line with an "exercises" list.
+Input is parsed as a stream and written in batches, one transaction each.
+"""
+import csv
+import json
+import sqlite3
+import time
+from typing import TypedDict
+
+import db
+from routes.progress import (
+    SQLITE_MAX_INT, _bulk_insert_workouts, _derive_category, _parse_date, _to_float, _to_int,
+)
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_BATCH_SIZE = 5000  # keeps the per-batch IN (...) lists well under SQLite's variable limit
+MAX_REPORTED_ERRORS = 100
+
+
+class _ImportCounts(TypedDict):
+    imported: int
+    exercises: int
+    skipped: int
+    batches: int
+    errors: list[dict]
+
+
+class ImportSummary(_ImportCounts, total=False):
+    seconds: float
+    error: str  # set when the input could not be read to the end
+
+
+class InvalidRecord(ValueError):
+    """A single record that failed validation; the import skips it and goes on."""
+
+
+def _text(line: int, value, field: str) -> str:
+    # CSV cells are always strings; JSON values can be anything
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise InvalidRecord(f"line {line}: {field} must be a string, got {value!r}")
+    return value.strip()
+
+
+def _int(line: int, value, field: str) -> int | None:
+    number = _to_int(value, None)
+    if number is not None and abs(number) > SQLITE_MAX_INT:
+        raise InvalidRecord(f"line {line}: {field} is out of range")
+    return number
+
+
+def _workout(line: int, raw: dict, exercises: list[tuple]):
+    workout_date = _parse_date(raw.get("workout_date"))
+    if not workout_date:
+        raise InvalidRecord(f"line {line}: invalid or missing date {raw.get('workout_date')!r}")
+    workout_type = _text(line, raw.get("workout_type"), "workout type")
+    if not workout_type:
+        raise InvalidRecord(f"line {line}: missing workout type")
+    return {
+        "workout_date": workout_date,
+        "workout_type": workout_type,
+        "category": _text(line, raw.get("category"), "category") or _derive_category(workout_type),
+        "duration_minutes": _int(line, raw.get("duration_minutes"), "duration"),
+        "performance_rating": _int(line, raw.get("performance_rating"), "performance rating"),
+        "feeling_rating": _int(line, raw.get("feeling_rating"), "feeling rating"),
+        "notes": _text(line, raw.get("notes"), "notes"),
+    }, exercises
+
+
+def _exercise(line: int, name, sets, reps, weight_kg):
+    name = _text(line, name, "exercise name")
+    if not name:
+        return None
+    return (name, _int(line, sets, "sets"), _int(line, reps, "reps"), _to_float(weight_kg, None))
+
+
+def parse_csv(lines):
+    """Yield (line, fields, exercises) or (line, InvalidRecord, None) per workout."""
+    reader = csv.DictReader(lines)
+    current_key, current = None, None
+
+    def finish():
+        line, raw, exercises = current
+        try:
+            if "invalid" in raw:
+                raise raw["invalid"]
+            return (line, *_workout(line, raw, exercises))
+        except InvalidRecord as exc:
+            return line, exc, None
+
+    for row in reader:
+        line = reader.line_num
+        # without a Workout_id column every row is its own workout
+        key = row.get("Workout_id") or f"row{line}"
+        if key != current_key:
+            if current:
+                yield finish()
+            current_key = key
+            current = (line, {
+                "workout_date": row.get("Date"),
+                "workout_type": row.get("Type"),
+                "category": row.get("Category"),
+                "duration_minutes": row.get("Duration_minutes"),
+                "performance_rating": row.get("Performance_rating"),
+                "feeling_rating": row.get("Feeling_rating"),
+                "notes": row.get("Notes"),
+            }, [])
+        try:
+            ex = _exercise(
+                line, row.get("Exercise"), row.get("Sets"), row.get("Reps"), row.get("Weight_kg")
+            )
+        except InvalidRecord as exc:
+            current[1]["invalid"] = exc  # the whole workout is skipped
+            continue
+        if ex:
+            current[2].append(ex)
+    if current:
+        yield finish()
+
+
+def parse_jsonl(lines):
+    """Yield (line, fields, exercises) or (line, InvalidRecord, None) per workout."""
+    for line, text in enumerate(lines, start=1):
+        if not text.strip():
+            continue
+        try:
+            raw = json.loads(text)
+            if not isinstance(raw, dict):
+                raise InvalidRecord(f"line {line}: expected a JSON object")
+            items = raw.get("exercises") or []
+            if not isinstance(items, list):
+                raise InvalidRecord(f"line {line}: exercises must be a list")
+            exercises = [
+                ex for ex in (
+                    _exercise(line, e.get("name") or e.get("exercise_name"),
+                              e.get("sets"), e.get("reps"), e.get("weight_kg"))
+                    for e in items
+                    if isinstance(e, dict)
+                ) if ex
+            ]
+            item = (line, *_workout(line, raw, exercises))
+        except InvalidRecord as exc:
+            item = (line, exc, None)
+        except ValueError as exc:  # malformed JSON
+            item = (line, InvalidRecord(f"line {line}: {exc}"), None)
+        yield item
+
+
+PARSERS = {"csv": parse_csv, "jsonl": parse_jsonl}
+
+
+def import_workouts(
+    lines, fmt: str, batch_size: int = DEFAULT_BATCH_SIZE, on_batch=None
+) -> ImportSummary:
+    """Import workouts from an iterable of text lines.
+
+    Every `batch_size` valid workouts are written as one db.run_write() job,
+    so each batch commits atomically. `on_batch(summary)` is called after each
+    commit for progress reporting. Invalid records are skipped and listed in
+    the summary; so is a record the database rejects, in which case the rest
+    of its batch is written one record at a time. Input that can't be read
+    (not UTF-8, malformed CSV) stops the import with `error` set; batches
+    committed before that point stay.
+    """
+    parse = PARSERS[fmt]
+    batch_size = min(max(int(batch_size), 1), MAX_BATCH_SIZE)
+    summary: ImportSummary = {
+        "imported": 0, "exercises": 0, "skipped": 0, "batches": 0, "errors": [],
+    }
+    started = time.perf_counter()
+    batch: list[tuple[int, dict, list[tuple]]] = []
+
+    def skip(line: int, error: str) -> None:
+        summary["skipped"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append({"line": line, "error": error})
+
+    def write(records: list[tuple[int, dict, list[tuple]]]) -> None:
+        rows = [(fields, exercises) for _line, fields, exercises in records]
+        db.run_write(lambda conn: _bulk_insert_workouts(conn, rows), alone=True)
+        summary["imported"] += len(rows)
+        summary["exercises"] += sum(len(exercises) for _fields, exercises in rows)
+
+    def flush():
+        try:
+            write(batch)
+        except (sqlite3.Error, ValueError, OverflowError):
+            for record in batch:
+                try:
+                    write([record])
+                except (sqlite3.Error, ValueError, OverflowError) as exc:
+                    skip(record[0], f"line {record[0]}: could not be saved: {exc}")
+        summary["batches"] += 1
+        batch.clear()
+        if on_batch:
+            on_batch(summary)
+
+    try:
+        for line, fields, exercises in parse(lines):
+            if isinstance(fields, InvalidRecord):
+                skip(line, str(fields))
+                continue
+            batch.append((line, fields, exercises))
+            if len(batch) >= batch_size:
+                flush()
+    except UnicodeDecodeError as exc:
+        summary["error"] = f"input is not valid UTF-8 ({exc.reason} at byte {exc.start})"
+        batch.clear()
+    except csv.Error as exc:
+        summary["error"] = f"malformed CSV: {exc}"
+        batch.clear()
+    if batch:
+        flush()
+
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
@@ -0,0 +1,102 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """Bounded background executor for slow exports.
+
+    Job state lives next to the artifact in the spool directory (<id>.json), so
+    any worker process can answer a status poll or serve the download, not
+    just the one that rendered it.
+    """
+
+    def __init__(self, app, spool_dir, max_workers=2, max_pending=16, max_artifacts=20):
+        self.app = app
+        self.spool_dir = Path(spool_dir)
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.max_pending = max_pending
+        self.max_artifacts = max_artifacts
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="report-job"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def _state_path(self, job_id: str) -> Path:
+        return self.spool_dir / f"{job_id}.json"
+
+    def _write_state(self, job: dict) -> None:
+        # write-then-rename so a concurrent poll never reads half a file
+        tmp = self._state_path(job["id"]).with_suffix(".tmp")
+        tmp.write_text(json.dumps(job), encoding="utf-8")
+        os.replace(tmp, self._state_path(job["id"]))
+
+    def submit(self, fn, suffix: str, params: dict) -> dict:
+        """Queue fn(path, **params); fn must write the artifact to `path`."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull()
+            self._pending += 1
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "artifact": f"{job_id}{suffix}",
+            "params": params,
+            "created_at": time.time(),
+            "finished_at": None,
+            "error": None,
+        }
+        self._write_state(job)
+        self._executor.submit(self._run, dict(job), fn)
+        return job
+
+    def _run(self, job: dict, fn) -> None:
+        job["status"] = "running"
+        self._write_state(job)
+        try:
+            with self.app.app_context():
+                fn(self.spool_dir / job["artifact"], **job["params"])
+            job["status"] = "done"
+        except Exception as exc:  # reported to the poller, not raised in the pool
+            job["status"] = "failed"
+            job["error"] = str(exc)
+        finally:
+            job["finished_at"] = time.time()
+            self._write_state(job)
+            with self._lock:
+                self._pending -= 1
+            self._prune()
+
+    def get(self, job_id: str) -> dict | None:
+        if not re.fullmatch(r"[0-9a-f]{32}", job_id):
+            return None
+        try:
+            return json.loads(self._state_path(job_id).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def artifact_path(self, job: dict) -> Path:
+        return self.spool_dir / job["artifact"]
+
+    def _prune(self) -> None:
+        finished = []
+        for state_path in self.spool_dir.glob("*.json"):
+            job = self.get(state_path.stem)
+            if job and job["finished_at"]:
+                finished.append(job)
+        finished.sort(key=lambda j: j["finished_at"])
+        for job in finished[:max(len(finished) - self.max_artifacts, 0)]:
+            self.artifact_path(job).unlink(missing_ok=True)
+            self._state_path(job["id"]).unlink(missing_ok=True)
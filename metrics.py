@@ -0,0 +1,160 @@
+import bisect
+import threading
+import time
+
+from flask import Response, g, request
+
+import db
+
+# Per-request histograms in the Prometheus text exposition format. Each
+# process keeps its own registry, so with several workers every worker's
+# /metrics reports its own share of the traffic.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed label set."""
+
+    def __init__(self, name: str, help_text: str, labels: tuple, buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # label values -> [bucket counts..., sum, count]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 3)
+            series[i] += 1  # i == len(buckets) is the +Inf-only slot
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(snapshot.items()):
+            pairs = [f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values)]
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), series):
+                cumulative += n
+                le = bound if bound == "+Inf" else repr(float(bound))
+                bucket_labels = ",".join([*pairs, f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            label_str = "{" + ",".join(pairs) + "}" if pairs else ""
+            lines.append(f"{self.name}_sum{label_str} {series[-2]!r}")
+            lines.append(f"{self.name}_count{label_str} {series[-1]}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REQUEST_SECONDS = Histogram(
+    "trainsphere_http_request_duration_seconds",
+    "Time to produce a response (streamed bodies excluded).",
+    ("endpoint", "method", "status"),
+    DURATION_BUCKETS,
+)
+SQL_SECONDS = Histogram(
+    "trainsphere_db_time_seconds",
+    "Time spent executing SQL and fetching rows, per request.",
+    ("endpoint",),
+    SQL_SECONDS_BUCKETS,
+)
+QUERIES = Histogram(
+    "trainsphere_db_queries",
+    "SQL statements executed per request.",
+    ("endpoint",),
+    QUERY_COUNT_BUCKETS,
+)
+REGISTRY = (REQUEST_SECONDS, SQL_SECONDS, QUERIES)
+
+# db.pool_stats() key -> (metric name, type, help)
+POOL_METRICS = {
+    "opened": ("trainsphere_db_pool_opened_total", "counter",
+               "Read connections opened by the pool."),
+    "reused": ("trainsphere_db_pool_reused_total", "counter",
+               "Read connections handed out from the idle list."),
+    "released": ("trainsphere_db_pool_released_total", "counter",
+                 "Read connections returned to the pool."),
+    "closed": ("trainsphere_db_pool_closed_total", "counter",
+               "Read connections closed (pool full or shut down)."),
+    "in_use": ("trainsphere_db_pool_in_use", "gauge", "Read connections borrowed right now."),
+    "idle": ("trainsphere_db_pool_idle", "gauge", "Idle read connections kept open."),
+    "pool_size": ("trainsphere_db_pool_size", "gauge", "Most idle read connections kept open."),
+}
+
+
+def _render_pool() -> list[str]:
+    lines = []
+    stats = db.pool_stats()
+    for key, (name, kind, help_text) in POOL_METRICS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {stats[key]}"]
+    return lines
+
+
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+def _observe(status: int) -> tuple[float, int, float] | None:
+    started = g.pop("request_started", None)
+    if started is None:  # already observed, or the request never got this far
+        return None
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or "unmatched"
+    conn = g.get("db")
+    queries, sql_seconds = (conn.queries, conn.sql_seconds) if conn is not None else (0, 0.0)
+    # statements this request ran on the writer thread (db.run_write)
+    queries += g.get("write_queries", 0)
+    sql_seconds += g.get("write_sql_seconds", 0.0)
+    REQUEST_SECONDS.observe(elapsed, endpoint, request.method, str(status))
+    SQL_SECONDS.observe(sql_seconds, endpoint)
+    QUERIES.observe(queries, endpoint)
+    return elapsed, queries, sql_seconds
+
+
+def init_app(app) -> None:
+    """Time every request of every blueprint and serve the histograms at /metrics.
+
+    SERVER_TIMING = True also reports the timings to the client in a
+    Server-Timing header (handy in browser dev tools).
+    """
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+
+    @app.after_request
+    def _after(response):
+        observed = _observe(response.status_code)
+        if observed and app.config.get("SERVER_TIMING", False):
+            elapsed, queries, sql_seconds = observed
+            response.headers["Server-Timing"] = (
+                f'app;dur={elapsed * 1000:.1f}, '
+                f'db;dur={sql_seconds * 1000:.1f};desc="{queries} queries"'
+            )
+        return response
+
+    @app.teardown_request
+    def _teardown(exc=None):
+        if exc is not None:
+            _observe(500)
+
+    app.before_request(_start_timer)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+
+
+def metrics_view():
+    lines = []
+    for histogram in REGISTRY:
+        lines.extend(histogram.render())
+    lines.extend(_render_pool())
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,601 @@
+import os
+import sqlite3
+from collections.abc import Callable
+from datetime import datetime
+
+import click
+
+import catalog
+import db
+from db import get_db
+
+# (version, description, fn) in the order they must be applied.
+MIGRATIONS: list[tuple[int, str, Callable[[sqlite3.Connection], None]]] = []
+
+
+def migration(version: int, description: str):
+    def register(fn):
+        if MIGRATIONS and MIGRATIONS[-1][0] >= version:
+            raise ValueError(f"migration {version} registered out of order")
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> list[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, decl: str) -> None:
+    # databases created before migrations existed may already have the column
+    if column not in _columns(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+@migration(1, "initial schema")
+def _initial_schema(conn):
+    # PROFILE
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS profile (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        age INTEGER,
+        height_cm INTEGER,
+        weight_kg REAL,
+        goal_text TEXT,
+        goal_weight_kg REAL,
+        quick_notes_json TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    _add_column(conn, "profile", "quick_notes_json", "TEXT")
+
+    # PLANS
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS custom_plan (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        workout_type TEXT NOT NULL,
+        frequency_per_week INTEGER NOT NULL,
+        goal_type TEXT NOT NULL,
+        goal_value INTEGER NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    # GOALS - Home page
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS goals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        metric TEXT NOT NULL,
+        target_value INTEGER NOT NULL,
+        target_unit TEXT NOT NULL,
+        target_date TEXT,
+        note TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    # Progress page
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS workouts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        workout_date TEXT DEFAULT CURRENT_DATE,
+        workout_type TEXT NOT NULL,
+        category TEXT,
+        duration_minutes INTEGER,
+        performance_rating INTEGER,
+        feeling_rating INTEGER,
+        notes TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    _add_column(conn, "workouts", "category", "TEXT")
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS workout_exercises (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        workout_id INTEGER NOT NULL,
+        exercise_name TEXT NOT NULL,
+        sets INTEGER,
+        reps INTEGER,
+        weight_kg REAL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (workout_id) REFERENCES workouts(id)
+    )
+    """)
+
+
+@migration(2, "custom_plan.checklist_json")
+def _plan_checklist(conn):
+    # routes/plans.py has always written this column, init_db never created it
+    _add_column(conn, "custom_plan", "checklist_json", "TEXT")
+
+
+@migration(3, "progress listing indexes, normalized categories")
+def _progress_indexes(conn):
+    # category is compared with plain `=` so the composite index stays usable
+    conn.execute(
+        "UPDATE workouts SET category = TRIM(COALESCE(category, '')) "
+        "WHERE category IS NULL OR category <> TRIM(category)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_workouts_date ON workouts(workout_date, id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_workouts_category_date "
+        "ON workouts(category, workout_date, id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_workout_exercises_workout "
+        "ON workout_exercises(workout_id, id)"
+    )
+
+
+@migration(4, "categories lookup table")
+def _categories(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS categories (
+        name TEXT PRIMARY KEY,
+        workout_count INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    INSERT OR REPLACE INTO categories (name, workout_count)
+    SELECT category, COUNT(*) FROM workouts WHERE category <> '' GROUP BY category
+    """)
+
+    # kept in step with workouts by triggers, so every write path is covered
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_categories_insert AFTER INSERT ON workouts
+    WHEN NEW.category <> ''
+    BEGIN
+        INSERT INTO categories (name, workout_count) VALUES (NEW.category, 1)
+        ON CONFLICT(name) DO UPDATE SET workout_count = workout_count + 1;
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_categories_delete AFTER DELETE ON workouts
+    WHEN OLD.category <> ''
+    BEGIN
+        UPDATE categories SET workout_count = workout_count - 1 WHERE name = OLD.category;
+        DELETE FROM categories WHERE name = OLD.category AND workout_count <= 0;
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_categories_update AFTER UPDATE OF category ON workouts
+    WHEN OLD.category IS NOT NEW.category
+    BEGIN
+        UPDATE categories SET workout_count = workout_count - 1 WHERE name = OLD.category;
+        DELETE FROM categories WHERE name = OLD.category AND workout_count <= 0;
+        INSERT INTO categories (name, workout_count)
+        SELECT NEW.category, 1 WHERE NEW.category <> ''
+        ON CONFLICT(name) DO UPDATE SET workout_count = workout_count + 1;
+    END
+    """)
+
+
+DATA_VERSION_TABLES = ("profile", "custom_plan", "workouts", "workout_exercises")
+
+
+@migration(5, "data_version counter")
+def _data_version(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS data_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+    """)
+    conn.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
+    for table in DATA_VERSION_TABLES:
+        _data_version_triggers(conn, table)
+
+
+def _data_version_triggers(conn, table: str) -> None:
+    for op in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_data_version_{table}_{op.lower()}
+        AFTER {op} ON {table}
+        BEGIN
+            UPDATE data_version SET version = version + 1 WHERE id = 1;
+        END
+        """)
+
+
+def _rollup_table(conn, table: str, key: str) -> None:
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        {key} TEXT NOT NULL,
+        category TEXT NOT NULL,
+        sessions INTEGER NOT NULL DEFAULT 0,
+        minutes INTEGER NOT NULL DEFAULT 0,
+        volume REAL NOT NULL DEFAULT 0,
+        performance_sum INTEGER NOT NULL DEFAULT 0,
+        performance_count INTEGER NOT NULL DEFAULT 0,
+        feeling_sum INTEGER NOT NULL DEFAULT 0,
+        feeling_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY ({key}, category)
+    ) WITHOUT ROWID
+    """)
+
+
+# Migrations that backfill derived tables carry their own copy of the SQL
+# (and of any Python helper) as it stood when they were written: the live
+# modules follow the latest schema, which a pending migration may predate.
+
+
+def _name_key(name: str | None) -> str:
+    # frozen copy of catalog.exercise_key()
+    return " ".join((name or "").split()).casefold()
+
+
+@migration(6, "daily and weekly training rollups")
+def _rollups(conn):
+    # the progress form used to store dates as typed ("2024-1-5"); the rollups
+    # key on the zero-padded ISO form that SQLite's date() understands
+    for row_id, raw in conn.execute(
+        "SELECT id, workout_date FROM workouts "
+        "WHERE workout_date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+    ).fetchall():
+        try:
+            fixed = datetime.strptime(raw.strip(), "%Y-%m-%d").date().isoformat()
+        except (AttributeError, ValueError):
+            continue  # not a date at all; the weekly backfill skips it
+        conn.execute("UPDATE workouts SET workout_date = ? WHERE id = ?", (fixed, row_id))
+
+    _rollup_table(conn, "rollup_daily", "day")
+    _rollup_table(conn, "rollup_weekly", "week_start")
+    conn.execute("""
+    INSERT INTO rollup_daily (day, category, sessions, minutes, volume, performance_sum,
+                              performance_count, feeling_sum, feeling_count)
+    SELECT w.workout_date, w.category,
+           COUNT(*),
+           COALESCE(SUM(w.duration_minutes), 0),
+           COALESCE(SUM((
+               SELECT SUM(COALESCE(e.sets, 0) * COALESCE(e.reps, 0) * COALESCE(e.weight_kg, 0))
+               FROM workout_exercises e
+               WHERE e.workout_id = w.id
+           )), 0),
+           COALESCE(SUM(w.performance_rating), 0), COUNT(w.performance_rating),
+           COALESCE(SUM(w.feeling_rating), 0), COUNT(w.feeling_rating)
+    FROM workouts w
+    GROUP BY w.workout_date, w.category
+    """)
+    conn.execute("""
+    INSERT INTO rollup_weekly (week_start, category, sessions, minutes, volume, performance_sum,
+                               performance_count, feeling_sum, feeling_count)
+    SELECT date(day, 'weekday 0', '-6 days'), category,
+           SUM(sessions), SUM(minutes), SUM(volume),
+           SUM(performance_sum), SUM(performance_count),
+           SUM(feeling_sum), SUM(feeling_count)
+    FROM rollup_daily
+    WHERE date(day) IS NOT NULL
+    GROUP BY 1, category
+    """)
+
+
+@migration(7, "exercise keys and personal records")
+def _records(conn):
+    _add_column(conn, "workout_exercises", "exercise_key", "TEXT")
+    # casefold() is Unicode-aware where SQLite's lower() is ASCII-only, so the
+    # key is computed in Python rather than as an expression index
+    conn.executemany(
+        "UPDATE workout_exercises SET exercise_key = ? WHERE id = ?",
+        [
+            (_name_key(name), row_id)
+            for row_id, name in conn.execute(
+                "SELECT id, exercise_name FROM workout_exercises"
+            ).fetchall()
+        ],
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_workout_exercises_key "
+        "ON workout_exercises(exercise_key)"
+    )
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS exercise_records (
+        exercise_key TEXT PRIMARY KEY,
+        exercise_name TEXT NOT NULL,
+        top_weight_kg REAL,
+        top_weight_workout_id INTEGER,
+        top_e1rm_kg REAL,
+        top_e1rm_workout_id INTEGER,
+        best_volume REAL NOT NULL DEFAULT 0,
+        best_volume_workout_id INTEGER
+    ) WITHOUT ROWID
+    """)
+    # heaviest set, best Epley e1RM and biggest per-workout volume per key;
+    # ties go to the earliest row
+    conn.execute("""
+    INSERT INTO exercise_records
+        (exercise_key, exercise_name, top_weight_kg, top_weight_workout_id,
+         top_e1rm_kg, top_e1rm_workout_id, best_volume, best_volume_workout_id)
+    WITH weight AS (
+        SELECT exercise_key, exercise_name, weight_kg, workout_id,
+               ROW_NUMBER() OVER (PARTITION BY exercise_key ORDER BY weight_kg DESC, id) AS n
+        FROM workout_exercises
+        WHERE weight_kg IS NOT NULL
+    ), e1rm AS (
+        SELECT exercise_key, value, workout_id,
+               ROW_NUMBER() OVER (PARTITION BY exercise_key ORDER BY value DESC, id) AS n
+        FROM (
+            SELECT exercise_key, workout_id, id,
+                   CASE WHEN weight_kg IS NULL OR COALESCE(reps, 0) < 1 THEN NULL
+                        WHEN reps = 1 THEN weight_kg
+                        ELSE weight_kg * (1 + reps / 30.0) END AS value
+            FROM workout_exercises
+        )
+        WHERE value IS NOT NULL
+    ), volume AS (
+        SELECT exercise_key, value, workout_id,
+               ROW_NUMBER() OVER (PARTITION BY exercise_key ORDER BY value DESC, workout_id) AS n
+        FROM (
+            SELECT exercise_key, workout_id,
+                   SUM(COALESCE(sets, 0) * COALESCE(reps, 0) * COALESCE(weight_kg, 0)) AS value
+            FROM workout_exercises
+            GROUP BY exercise_key, workout_id
+        )
+    )
+    SELECT v.exercise_key,
+           COALESCE(w.exercise_name, (SELECT exercise_name FROM workout_exercises
+                                      WHERE exercise_key = v.exercise_key LIMIT 1)),
+           w.weight_kg, w.workout_id, r.value, r.workout_id, v.value, v.workout_id
+    FROM volume v
+    LEFT JOIN weight w ON w.exercise_key = v.exercise_key AND w.n = 1
+    LEFT JOIN e1rm r ON r.exercise_key = v.exercise_key AND r.n = 1
+    WHERE v.n = 1
+    """)
+
+
+@migration(8, "full-text search index")
+def _search(conn):
+    conn.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS workout_search USING fts5(
+        workout_type, notes, exercises,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """)
+    conn.execute("""
+    INSERT INTO workout_search (rowid, workout_type, notes, exercises)
+    SELECT w.id, w.workout_type, COALESCE(w.notes, ''),
+           COALESCE((SELECT group_concat(e.exercise_name, ' · ')
+                     FROM workout_exercises e WHERE e.workout_id = w.id), '')
+    FROM workouts w
+    """)
+
+
+@migration(9, "interned exercise catalogue")
+def _exercise_catalogue(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS exercises (
+        id INTEGER PRIMARY KEY,
+        key TEXT NOT NULL UNIQUE,
+        name TEXT NOT NULL
+    )
+    """)
+    names: dict[str, str] = {}
+    for (name,) in conn.execute(
+        "SELECT exercise_name FROM workout_exercises ORDER BY id"
+    ).fetchall():
+        names.setdefault(_name_key(name), " ".join((name or "").split()))
+    conn.executemany(
+        "INSERT OR IGNORE INTO exercises (key, name) VALUES (?, ?)", names.items()
+    )
+
+    _add_column(conn, "workout_exercises", "exercise_id", "INTEGER REFERENCES exercises(id)")
+    conn.execute("""
+    UPDATE workout_exercises
+    SET exercise_id = (SELECT x.id FROM exercises x WHERE x.key = workout_exercises.exercise_key)
+    """)
+    conn.execute("DROP INDEX IF EXISTS idx_workout_exercises_key")
+    conn.execute("ALTER TABLE workout_exercises DROP COLUMN exercise_key")
+    conn.execute("ALTER TABLE workout_exercises DROP COLUMN exercise_name")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_workout_exercises_exercise "
+        "ON workout_exercises(exercise_id)"
+    )
+
+    # records were keyed by the name key; rebuild them keyed by exercise id
+    conn.execute("DROP TABLE exercise_records")
+    conn.execute("""
+    CREATE TABLE exercise_records (
+        exercise_id INTEGER PRIMARY KEY REFERENCES exercises(id),
+        top_weight_kg REAL,
+        top_weight_workout_id INTEGER,
+        top_e1rm_kg REAL,
+        top_e1rm_workout_id INTEGER,
+        best_volume REAL NOT NULL DEFAULT 0,
+        best_volume_workout_id INTEGER
+    )
+    """)
+    conn.execute("""
+    INSERT INTO exercise_records
+        (exercise_id, top_weight_kg, top_weight_workout_id,
+         top_e1rm_kg, top_e1rm_workout_id, best_volume, best_volume_workout_id)
+    WITH weight AS (
+        SELECT exercise_id, weight_kg, workout_id,
+               ROW_NUMBER() OVER (PARTITION BY exercise_id ORDER BY weight_kg DESC, id) AS n
+        FROM workout_exercises
+        WHERE weight_kg IS NOT NULL
+    ), e1rm AS (
+        SELECT exercise_id, value, workout_id,
+               ROW_NUMBER() OVER (PARTITION BY exercise_id ORDER BY value DESC, id) AS n
+        FROM (
+            SELECT exercise_id, workout_id, id,
+                   CASE WHEN weight_kg IS NULL OR COALESCE(reps, 0) < 1 THEN NULL
+                        WHEN reps = 1 THEN weight_kg
+                        ELSE weight_kg * (1 + reps / 30.0) END AS value
+            FROM workout_exercises
+        )
+        WHERE value IS NOT NULL
+    ), volume AS (
+        SELECT exercise_id, value, workout_id,
+               ROW_NUMBER() OVER (PARTITION BY exercise_id ORDER BY value DESC, workout_id) AS n
+        FROM (
+            SELECT exercise_id, workout_id,
+                   SUM(COALESCE(sets, 0) * COALESCE(reps, 0) * COALESCE(weight_kg, 0)) AS value
+            FROM workout_exercises
+            GROUP BY exercise_id, workout_id
+        )
+    )
+    SELECT v.exercise_id, w.weight_kg, w.workout_id, r.value, r.workout_id, v.value, v.workout_id
+    FROM volume v
+    LEFT JOIN weight w ON w.exercise_id = v.exercise_id AND w.n = 1
+    LEFT JOIN e1rm r ON r.exercise_id = v.exercise_id AND r.n = 1
+    WHERE v.n = 1
+    """)
+
+    # the indexed exercise names now come from the catalogue spelling
+    conn.execute("DELETE FROM workout_search")
+    conn.execute("""
+    INSERT INTO workout_search (rowid, workout_type, notes, exercises)
+    SELECT w.id, w.workout_type, COALESCE(w.notes, ''),
+           COALESCE((SELECT group_concat(x.name, ' · ')
+                     FROM workout_exercises e JOIN exercises x ON x.id = e.exercise_id
+                     WHERE e.workout_id = w.id), '')
+    FROM workouts w
+    """)
+
+
+@migration(10, "workouts.row_version")
+def _row_version(conn):
+    # bumped by every edit; cached workout cards are keyed by (id, row_version)
+    _add_column(conn, "workouts", "row_version", "INTEGER NOT NULL DEFAULT 1")
+
+
+@migration(11, "sync idempotency keys")
+def _sync_keys(conn):
+    # client-generated key of every workout uploaded through /progress/api/sync
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sync_keys (
+        key TEXT PRIMARY KEY,
+        workout_id INTEGER NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    ) WITHOUT ROWID
+    """)
+
+
+@migration(12, "data_version triggers on goals")
+def _goal_data_version(conn):
+    # goal progress (goals.py) is cached per data_version
+    _data_version_triggers(conn, "goals")
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def upgrade(conn: sqlite3.Connection, target: int | None = None) -> list[int]:
+    """Apply pending migrations up to `target` and return the applied versions.
+
+    BEGIN IMMEDIATE takes the write lock before the version is re-read, so when
+    several workers boot at once only the first one runs the DDL and the others
+    find the schema already current.
+    """
+    target = latest_version() if target is None else target
+    applied = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = current_version(conn)
+        for number, _description, fn in MIGRATIONS:
+            if version < number <= target:
+                fn(conn)
+                applied.append(number)
+        if applied:
+            conn.execute(f"PRAGMA user_version = {applied[-1]}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if applied:
+        # exercise ids cached for this file may belong to an older database
+        catalog.clear_cache()
+    return applied
+
+
+def ensure_current(app) -> None:
+    """Startup check: one PRAGMA read when the schema is already up to date.
+
+    Uses its own read-write connection: request connections are read-only
+    and a brand-new database file has to be created first.
+    """
+    conn = db.connect_writer()
+    try:
+        if current_version(conn) >= latest_version():
+            return
+        if not app.config.get("AUTO_MIGRATE", True):
+            message = (
+                f"database schema is at version {current_version(conn)}, "
+                f"expected {latest_version()}; run `flask --app app db upgrade`"
+            )
+            # every `flask` command, `db upgrade` included, builds the app
+            # first, so under the CLI this can only warn
+            if os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+                app.logger.warning(message)
+                return
+            raise RuntimeError(message)
+        upgrade(conn)
+    finally:
+        conn.close()
+
+
+@click.group("db")
+def db_cli():
+    """Database schema commands."""
+
+
+@db_cli.command("upgrade")
+@click.option("--target", type=int, default=None, help="Stop at this schema version.")
+def upgrade_command(target):
+    """Apply pending schema migrations."""
+    conn = db.connect_writer()
+    try:
+        applied = upgrade(conn, target)
+    finally:
+        conn.close()
+    if applied:
+        click.echo(f"Applied migrations: {', '.join(map(str, applied))}")
+    else:
+        click.echo("Schema already up to date.")
+
+
+@db_cli.command("version")
+def version_command():
+    """Show the current and latest schema version."""
+    click.echo(f"current={current_version(get_db())} latest={latest_version()}")
+
+
+@db_cli.command("check-plans")
+def check_plans_command():
+    """Fail if a registered hot query plans a full scan or temp sort."""
+    conn = get_db()
+    failed = False
+    for name, (sql, params) in sorted(db.HOT_QUERIES.items()):
+        details = db.explain(conn, sql, params)
+        problems = db.plan_problems(details)
+        click.echo(f"{'FAIL' if problems else 'ok  '} {name}: {' | '.join(details)}")
+        failed = failed or bool(problems)
+    if failed:
+        raise click.ClickException("hot query plan regressed to a scan")
+
+
+@db_cli.command("rebuild")
+@click.argument("names", nargs=-1)
+def rebuild_command(names):
+    """Recompute derived tables from the raw data (default: all of them)."""
+    unknown = set(names) - set(db.REBUILDERS)
+    if unknown:
+        raise click.BadParameter(
+            f"unknown: {', '.join(sorted(unknown))}; choose from {', '.join(sorted(db.REBUILDERS))}"
+        )
+    for name in names or sorted(db.REBUILDERS):
+        db.run_write(db.REBUILDERS[name])
+        click.echo(f"Rebuilt {name}.")
+
+
+def init_app(app) -> None:
+    app.cli.add_command(db_cli)
@@ -0,0 +1,175 @@
+import db
+
+# Personal records per catalogue exercise (see catalog.py).
+# Each record remembers which workout set it, which is what makes incremental
+# maintenance cheap: a write can only *lower* a record if it touches the
+# workout that holds it; otherwise new rows can only raise it.
+HOLDER_COLUMNS = ("top_weight_workout_id", "top_e1rm_workout_id", "best_volume_workout_id")
+
+
+def e1rm(weight_kg, reps) -> float | None:
+    """Estimated one-rep max (Epley); a single rep is its own max."""
+    if weight_kg is None or not reps:
+        return None
+    return weight_kg if reps <= 1 else weight_kg * (1 + reps / 30.0)
+
+
+# Same formulas as e1rm()/volume above, pushed into SQL for the recompute path.
+_E1RM_SQL = (
+    "CASE WHEN weight_kg IS NULL OR COALESCE(reps, 0) < 1 THEN NULL "
+    "WHEN reps = 1 THEN weight_kg ELSE weight_kg * (1 + reps / 30.0) END"
+)
+_VOLUME_SQL = "COALESCE(sets, 0) * COALESCE(reps, 0) * COALESCE(weight_kg, 0)"
+
+
+def _recompute(conn, exercise_id: int) -> None:
+    """Rebuild one record from its rows via idx_workout_exercises_exercise."""
+    top_weight = conn.execute(
+        """SELECT weight_kg, workout_id FROM workout_exercises
+           WHERE exercise_id = ? AND weight_kg IS NOT NULL
+           ORDER BY weight_kg DESC, id LIMIT 1""",
+        (exercise_id,),
+    ).fetchone()
+    top_e1rm = conn.execute(
+        f"""SELECT {_E1RM_SQL} AS value, workout_id FROM workout_exercises
+            WHERE exercise_id = ? AND value IS NOT NULL
+            ORDER BY value DESC, id LIMIT 1""",
+        (exercise_id,),
+    ).fetchone()
+    best_volume = conn.execute(
+        f"""SELECT SUM({_VOLUME_SQL}) AS value, workout_id FROM workout_exercises
+            WHERE exercise_id = ?
+            GROUP BY workout_id
+            ORDER BY value DESC, workout_id LIMIT 1""",
+        (exercise_id,),
+    ).fetchone()
+
+    if best_volume is None:  # no rows left for this exercise
+        conn.execute("DELETE FROM exercise_records WHERE exercise_id = ?", (exercise_id,))
+        return
+
+    conn.execute(
+        """INSERT OR REPLACE INTO exercise_records
+           (exercise_id, top_weight_kg, top_weight_workout_id,
+            top_e1rm_kg, top_e1rm_workout_id, best_volume, best_volume_workout_id)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        (
+            exercise_id,
+            top_weight["weight_kg"] if top_weight else None,
+            top_weight["workout_id"] if top_weight else None,
+            top_e1rm["value"] if top_e1rm else None,
+            top_e1rm["workout_id"] if top_e1rm else None,
+            best_volume["value"],
+            best_volume["workout_id"],
+        ),
+    )
+
+
+def _bump(conn, record, rows_by_workout: dict) -> None:
+    """Raise `record` with rows that new or edited (non-holder) workouts added."""
+    best = {
+        "top_weight_kg": record["top_weight_kg"],
+        "top_e1rm_kg": record["top_e1rm_kg"],
+        "best_volume": record["best_volume"],
+    }
+    updates: dict[str, float | int] = {}
+    for workout_id, rows in rows_by_workout.items():
+        for r in rows:
+            if r["weight_kg"] is not None and (
+                best["top_weight_kg"] is None or r["weight_kg"] > best["top_weight_kg"]
+            ):
+                best["top_weight_kg"] = r["weight_kg"]
+                updates.update(top_weight_kg=r["weight_kg"], top_weight_workout_id=workout_id)
+            value = e1rm(r["weight_kg"], r["reps"])
+            if value is not None and (best["top_e1rm_kg"] is None or value > best["top_e1rm_kg"]):
+                best["top_e1rm_kg"] = value
+                updates.update(top_e1rm_kg=value, top_e1rm_workout_id=workout_id)
+        volume = sum((r["sets"] or 0) * (r["reps"] or 0) * (r["weight_kg"] or 0) for r in rows)
+        if volume > best["best_volume"]:
+            best["best_volume"] = volume
+            updates.update(best_volume=volume, best_volume_workout_id=workout_id)
+
+    if updates:
+        assignments = ", ".join(f"{col} = ?" for col in updates)
+        conn.execute(
+            f"UPDATE exercise_records SET {assignments} WHERE exercise_id = ?",
+            (*updates.values(), record["exercise_id"]),
+        )
+
+
+def _rows_by_exercise(conn, workout_ids: list[int]) -> dict:
+    """{exercise_id: {workout_id: [rows]}} for the given workouts."""
+    by_exercise: dict[int, dict[int, list]] = {}
+    q_marks = ",".join(["?"] * len(workout_ids))
+    for r in conn.execute(
+        f"""SELECT workout_id, exercise_id, sets, reps, weight_kg
+            FROM workout_exercises WHERE workout_id IN ({q_marks})
+            ORDER BY workout_id, id""",
+        workout_ids,
+    ).fetchall():
+        by_exercise.setdefault(r["exercise_id"], {}).setdefault(r["workout_id"], []).append(r)
+    return by_exercise
+
+
+def apply_workout(conn, workout_id: int, old_exercise_ids) -> None:
+    """Bring the records in line after workout_id's exercise rows changed.
+
+    `old_exercise_ids` are the exercises the workout had before the write
+    (empty for a new workout). Must run inside the write transaction, after
+    the rows were written.
+    """
+    rows_by_exercise = _rows_by_exercise(conn, [workout_id])
+    for exercise_id in set(old_exercise_ids) | set(rows_by_exercise):
+        record = conn.execute(
+            "SELECT * FROM exercise_records WHERE exercise_id = ?", (exercise_id,)
+        ).fetchone()
+        if record is None or workout_id in (record[c] for c in HOLDER_COLUMNS):
+            _recompute(conn, exercise_id)
+        elif exercise_id in rows_by_exercise:
+            _bump(conn, record, rows_by_exercise[exercise_id])
+
+
+def apply_new_workouts(conn, workout_ids: list[int]) -> None:
+    """Batch form of apply_workout() for freshly inserted workouts (bulk import).
+
+    New workouts can't hold a record yet, so each exercise touched by the
+    batch costs one record lookup and at most one write.
+    """
+    if not workout_ids:
+        return
+    for exercise_id, rows_by_workout in _rows_by_exercise(conn, workout_ids).items():
+        record = conn.execute(
+            "SELECT * FROM exercise_records WHERE exercise_id = ?", (exercise_id,)
+        ).fetchone()
+        if record is None:
+            _recompute(conn, exercise_id)
+        else:
+            _bump(conn, record, rows_by_workout)
+
+
+def rebuild(conn) -> None:
+    conn.execute("DELETE FROM exercise_records")
+    exercise_ids = [r[0] for r in conn.execute(
+        "SELECT DISTINCT exercise_id FROM workout_exercises"
+    ).fetchall()]
+    for exercise_id in exercise_ids:
+        _recompute(conn, exercise_id)
+
+
+def fetch_all(conn) -> list:
+    """Every record with the dates of the workouts that set it."""
+    return conn.execute(
+        """SELECT r.*, x.name AS exercise_name,
+                  tw.workout_date AS top_weight_date,
+                  te.workout_date AS top_e1rm_date,
+                  bv.workout_date AS best_volume_date
+           FROM exercise_records r
+           JOIN exercises x ON x.id = r.exercise_id
+           LEFT JOIN workouts tw ON tw.id = r.top_weight_workout_id
+           LEFT JOIN workouts te ON te.id = r.top_e1rm_workout_id
+           LEFT JOIN workouts bv ON bv.id = r.best_volume_workout_id
+           ORDER BY x.name COLLATE NOCASE"""
+    ).fetchall()
+
+
+db.register_rebuilder("records", rebuild)
@@ -0,0 +1,116 @@
+from datetime import date, timedelta
+
+import db
+
+# Per (day, category) and per (ISO week, category) training totals. Ratings are
+# kept as sum + count so averages stay exact when rows are added together.
+ROLLUP_COLUMNS = (
+    "sessions",
+    "minutes",
+    "volume",
+    "performance_sum",
+    "performance_count",
+    "feeling_sum",
+    "feeling_count",
+)
+
+# volume = sets x reps x weight_kg, summed per workout via idx_workout_exercises_workout
+_DAILY_SELECT = """
+    SELECT w.workout_date, w.category,
+           COUNT(*),
+           COALESCE(SUM(w.duration_minutes), 0),
+           COALESCE(SUM((
+               SELECT SUM(COALESCE(e.sets, 0) * COALESCE(e.reps, 0) * COALESCE(e.weight_kg, 0))
+               FROM workout_exercises e
+               WHERE e.workout_id = w.id
+           )), 0),
+           COALESCE(SUM(w.performance_rating), 0), COUNT(w.performance_rating),
+           COALESCE(SUM(w.feeling_rating), 0), COUNT(w.feeling_rating)
+    FROM workouts w
+    WHERE {where}
+    GROUP BY w.workout_date, w.category
+"""
+
+# date(day, 'weekday 0', '-6 days') is the Monday that starts day's ISO week
+_WEEKLY_SELECT = """
+    SELECT date(day, 'weekday 0', '-6 days'), category,
+           SUM(sessions), SUM(minutes), SUM(volume),
+           SUM(performance_sum), SUM(performance_count),
+           SUM(feeling_sum), SUM(feeling_count)
+    FROM rollup_daily
+    WHERE {where}
+    GROUP BY 1, category
+"""
+
+_COLS = ", ".join(ROLLUP_COLUMNS)
+
+
+def week_start(day: str) -> str:
+    d = date.fromisoformat(day)
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+
+def refresh_days(conn, days) -> None:
+    """Recompute the daily rows for `days` and the weekly rows containing them.
+
+    Called inside the write transaction with every date a save or delete
+    touched (old and new date on an edit), so the work is proportional to the
+    workouts on those days, not to the whole history.
+    """
+    days = sorted({d for d in days if d})
+    if not days:
+        return
+    q_marks = ",".join(["?"] * len(days))
+    conn.execute(f"DELETE FROM rollup_daily WHERE day IN ({q_marks})", days)
+    conn.execute(
+        f"INSERT INTO rollup_daily (day, category, {_COLS}) "
+        + _DAILY_SELECT.format(where=f"w.workout_date IN ({q_marks})"),
+        days,
+    )
+
+    weeks = sorted({week_start(d) for d in days})
+    q_marks = ",".join(["?"] * len(weeks))
+    conn.execute(f"DELETE FROM rollup_weekly WHERE week_start IN ({q_marks})", weeks)
+    # one primary-key range per week rather than a function over every row
+    ranges, params = [], []
+    for ws in weeks:
+        ranges.append("day BETWEEN ? AND ?")
+        params.extend([ws, (date.fromisoformat(ws) + timedelta(days=6)).isoformat()])
+    conn.execute(
+        f"INSERT INTO rollup_weekly (week_start, category, {_COLS}) "
+        + _WEEKLY_SELECT.format(where=" OR ".join(ranges)),
+        params,
+    )
+
+
+def rebuild(conn) -> None:
+    """Recompute both rollup tables from the raw workouts."""
+    conn.execute("DELETE FROM rollup_daily")
+    conn.execute("DELETE FROM rollup_weekly")
+    conn.execute(
+        f"INSERT INTO rollup_daily (day, category, {_COLS}) " + _DAILY_SELECT.format(where="1")
+    )
+    conn.execute(
+        f"INSERT INTO rollup_weekly (week_start, category, {_COLS}) "
+        + _WEEKLY_SELECT.format(where="1")
+    )
+
+
+def fetch(conn, grain: str, date_from: str, date_to: str, category: str = "") -> list:
+    """Rollup rows for a date range, at "day" or "week" grain."""
+    table, key = ("rollup_weekly", "week_start") if grain == "week" else ("rollup_daily", "day")
+    where = [f"{key} BETWEEN ? AND ?"]
+    params = [week_start(date_from) if grain == "week" else date_from, date_to]
+    if category:
+        where.append("category = ?")
+        params.append(category)
+    return conn.execute(
+        f"""SELECT {key} AS period, category, {_COLS}
+            FROM {table}
+            WHERE {' AND '.join(where)}
+            ORDER BY {key}, category""",
+        params,
+    ).fetchall()
+
+
+db.register_rebuilder("rollups", rebuild)
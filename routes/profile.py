@@ -1,16 +1,10 @@
 from flask import Blueprint, render_template, request, redirect, url_for
 import json
-import sqlite3
-from pathlib import Path
-
-profile_bp = Blueprint("profile", __name__, url_prefix="/profile")
-DB_PATH = Path(__file__).resolve().parents[1] / "trainsphere.db"
 
+import db
+from db import get_db
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+profile_bp = Blueprint("profile", __name__, url_prefix="/profile")
 
 @profile_bp.route("", methods=["GET", "POST"])
 def page():
@@ -27,7 +21,7 @@ def page():
         quick_notes = request.form.getlist("quick_notes")
         quick_notes_json = json.dumps(quick_notes, ensure_ascii=False) if quick_notes else None
 
-        with get_db() as conn:
+        def save(conn):
             existing = conn.execute(
                 "SELECT * FROM profile ORDER BY id DESC LIMIT 1"
             ).fetchone()
@@ -51,7 +45,6 @@ def page():
                         existing["id"],
                     ),
                 )
-                conn.commit()
             else:
                 # Create only if name exists (required)
                 if name:
@@ -61,8 +54,8 @@ def page():
                            VALUES (?, ?, ?, ?, ?, ?, ?)""",
                         (name, age, height_cm, weight_kg, goal_text, goal_weight_kg, quick_notes_json),
                     )
-                    conn.commit()
 
+        db.run_write(save)
         return redirect(url_for("profile.page"))
 
 
@@ -1,16 +1,34 @@
-from flask import Blueprint, render_template, request, redirect, url_for
-import sqlite3
-from pathlib import Path
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, jsonify
+from markupsafe import Markup
 from datetime import date, datetime, timedelta
+import io
+import sqlite3
+
+import click
+
+import analytics
+import catalog
+import db
+from cache import LRUCache
+import records
+import rollups
+import search
+from db import get_db
 
 progress_bp = Blueprint("progress", __name__, url_prefix="/progress")
-DB_PATH = Path(__file__).resolve().parents[1] / "trainsphere.db"
 
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+@progress_bp.record_once
+def _init_progress(state):
+    # workout id -> (row_version, rendered _workout_card.html)
+    state.app.extensions["workout_cards"] = LRUCache(
+        max_bytes=state.app.config.get("CARD_CACHE_BYTES", 4 * 1024 * 1024),
+        sizeof=lambda entry: len(entry[1]),
+    )
+    # analytics for ranges that ended before today, per data_version
+    state.app.extensions["analytics_cache"] = LRUCache(
+        max_entries=state.app.config.get("ANALYTICS_CACHE_ENTRIES", 256)
+    )
 
 
 def _derive_category(workout_type: str) -> str:
@@ -27,12 +45,12 @@ def _derive_category(workout_type: str) -> str:
 
 
 def _parse_date(s: str | None) -> str | None:
-    if not s:
+    if not s or not isinstance(s, str):
         return None
     s = s.strip()
     try:
-        datetime.strptime(s, "%Y-%m-%d")
-        return s
+        # normalized, so "2024-1-5" is stored as "2024-01-05"
+        return datetime.strptime(s, "%Y-%m-%d").date().isoformat()
     except Exception:
         return None
 
@@ -41,6 +59,9 @@ def _compute_period(period: str):
     today = date.today()
     p = (period or "week").strip().lower()
 
+    if p == "all":
+        return "0000-01-01", "9999-12-31"
+
     if p == "month":
         f = today.replace(day=1)
         if f.month == 12:
@@ -82,21 +103,394 @@ WORKOUT_TEMPLATES = {
 }
 
 
-@progress_bp.route("", methods=["GET", "POST"])
-def page():
-    def to_int(x, default=None):
-        try:
-            return int(x)
-        except:
-            return default
+DEFAULT_CATEGORIES = ["Strength", "Cardio", "HIIT", "Mobility", "General"]
+RECENT_LIMIT = 50
+
+
+def _list_categories(conn) -> list[str]:
+    # `categories` is maintained by triggers on workouts (migration 4)
+    categories = [r[0] for r in conn.execute(
+        "SELECT name FROM categories ORDER BY name"
+    ).fetchall()]
+    for c in DEFAULT_CATEGORIES:
+        if c not in categories:
+            categories.append(c)
+    return categories
+
+
+def _listing_sql(where: list[str]) -> str:
+    # `category = ?` (not COALESCE) so idx_workouts_category_date can serve it
+    return f"""
+        SELECT w.id, w.workout_date, w.workout_type, w.category,
+               w.duration_minutes, w.performance_rating, w.feeling_rating, w.notes,
+               w.row_version
+        FROM workouts w
+        WHERE {' AND '.join(where)}
+        ORDER BY workout_date DESC, id DESC
+        LIMIT ?
+    """
+
+
+def _exercises_sql(count: int) -> str:
+    q_marks = ",".join(["?"] * count)
+    return f"""
+        SELECT e.workout_id, x.name AS exercise_name, e.sets, e.reps, e.weight_kg
+        FROM workout_exercises e
+        JOIN exercises x ON x.id = e.exercise_id
+        WHERE e.workout_id IN ({q_marks})
+        ORDER BY e.workout_id, e.id
+    """
+
+
+def _encode_cursor(row) -> str:
+    return f"{row['workout_date']},{row['id']}"
+
+
+def _decode_cursor(raw: str | None):
+    if not raw:
+        return None
+    date_part, _, id_part = raw.rpartition(",")
+    workout_date = _parse_date(date_part)
+    try:
+        return (workout_date, int(id_part)) if workout_date else None
+    except ValueError:
+        return None
+
+
+def _load_exercises(conn, ids: list[int]) -> dict:
+    by_workout: dict[int, list] = {}
+    if ids:
+        for ex in conn.execute(_exercises_sql(len(ids)), ids).fetchall():
+            by_workout.setdefault(ex["workout_id"], []).append(ex)
+    return by_workout
+
+
+def _workout_cards(rows, load_exercises) -> list[Markup]:
+    """Rendered history cards for listing `rows`, reusing cached ones.
+
+    A cached card is used only while its row_version matches the row's, so a
+    card edited through another worker process is re-rendered here too.
+    `load_exercises(ids)` is called once, for the cards that missed.
+    """
+    cache = current_app.extensions["workout_cards"]
+    cards = {}
+    for w in rows:
+        cached = cache.get(w["id"])
+        if cached is not None and cached[0] == w["row_version"]:
+            cards[w["id"]] = cached[1]
+    missing = [w for w in rows if w["id"] not in cards]
+    if missing:
+        exercises = load_exercises([w["id"] for w in missing])
+        for w in missing:
+            html = Markup(render_template(
+                "_workout_card.html", w=w, ex_list=exercises.get(w["id"], [])
+            ))
+            cache.put(w["id"], (w["row_version"], html))
+            cards[w["id"]] = html
+    return [cards[w["id"]] for w in rows]
+
+
+def _forget_card(workout_id: int | None) -> None:
+    if workout_id:
+        current_app.extensions["workout_cards"].pop(workout_id)
+
+
+db.register_hot_query(
+    "progress.listing", _listing_sql(["workout_date BETWEEN ? AND ?"]),
+    ("2024-01-01", "2024-01-31", RECENT_LIMIT),
+)
+db.register_hot_query(
+    "progress.listing_by_category",
+    _listing_sql(["workout_date BETWEEN ? AND ?", "category = ?"]),
+    ("2024-01-01", "2024-01-31", "Strength", RECENT_LIMIT),
+)
+db.register_hot_query(
+    "progress.api_keyset",
+    _listing_sql(["workout_date BETWEEN ? AND ?", "(workout_date, id) < (?, ?)"]),
+    ("0000-01-01", "9999-12-31", "2024-01-31", 100, RECENT_LIMIT + 1),
+)
+db.register_hot_query("progress.listing_exercises", _exercises_sql(3), (1, 2, 3))
+
+
+# largest integer SQLite stores; Python ints beyond it fail to bind
+SQLITE_MAX_INT = 2**63 - 1
+
+
+def _to_int(x, default=None):
+    try:
+        return int(x)
+    except (TypeError, ValueError, OverflowError):
+        return default
 
-    def to_float(x, default=None):
-        try:
-            return float(x)
-        except:
-            return default
 
-    
+def _bounded_int(x, label: str):
+    """_to_int() that raises InvalidWorkout for a value SQLite can't store."""
+    number = _to_int(x, None)
+    if number is not None and abs(number) > SQLITE_MAX_INT:
+        raise InvalidWorkout(f"{label} is out of range")
+    return number
+
+
+def _to_float(x, default=None):
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return default
+
+
+WORKOUT_FIELDS = (
+    "workout_date",
+    "workout_type",
+    "category",
+    "duration_minutes",
+    "performance_rating",
+    "feeling_rating",
+    "notes",
+)
+
+_INSERT_WORKOUT_SQL = f"""
+    INSERT INTO workouts ({", ".join(WORKOUT_FIELDS)})
+    VALUES ({", ".join("?" * len(WORKOUT_FIELDS))})
+"""
+_INSERT_WORKOUT_WITH_ID_SQL = f"""
+    INSERT INTO workouts (id, {", ".join(WORKOUT_FIELDS)})
+    VALUES (?, {", ".join("?" * len(WORKOUT_FIELDS))})
+"""
+
+
+def _workout_fields(raw) -> dict:
+    """WORKOUT_FIELDS from a form or a decoded JSON object, with the form's defaults."""
+    workout_type = str(raw.get("workout_type") or "Strength (Upper)")
+    return {
+        "workout_date": _parse_date(raw.get("workout_date")) or date.today().isoformat(),
+        "workout_type": workout_type,
+        "category": str(raw.get("category") or "").strip() or _derive_category(workout_type),
+        "duration_minutes": _bounded_int(raw.get("duration_minutes"), "duration_minutes"),
+        "performance_rating": _bounded_int(raw.get("performance_rating"), "performance_rating"),
+        "feeling_rating": _bounded_int(raw.get("feeling_rating"), "feeling_rating"),
+        "notes": str(raw.get("notes") or "").strip(),
+    }
+
+
+def _workout_from_form(form):
+    """Parse the progress form into (workout_id or None, fields, exercises).
+
+    Raises InvalidWorkout for a number SQLite can't store.
+    """
+    workout_id = _bounded_int(form.get("workout_id"), "workout_id") or None
+    fields = _workout_fields(form)
+
+    names = form.getlist("exercise_name[]")
+    sets_list = form.getlist("sets[]")
+    reps_list = form.getlist("reps[]")
+    weights_list = form.getlist("weight_kg[]")
+
+    exercises = []
+    for i, name in enumerate(names):
+        name = (name or "").strip()
+        if not name:
+            continue
+        exercises.append((
+            name,
+            _bounded_int(sets_list[i] if i < len(sets_list) else None, f"sets[{i}]"),
+            _bounded_int(reps_list[i] if i < len(reps_list) else None, f"reps[{i}]"),
+            _to_float(weights_list[i] if i < len(weights_list) else None, None),
+        ))
+    return workout_id, fields, exercises
+
+
+class InvalidWorkout(ValueError):
+    """A submitted workout with a field of the wrong type or out of range;
+    the message names the field."""
+
+
+def _json_text(data: dict, name: str, label: str | None = None) -> str | None:
+    value = data.get(name)
+    if value is None or isinstance(value, str):
+        return value
+    raise InvalidWorkout(f"{label or name} must be a string")
+
+
+def _json_number(data: dict, name: str, convert, label: str):
+    value = data.get(name)
+    if value is None or value == "":
+        return None
+    if not isinstance(value, (int, float, str)) or isinstance(value, bool):
+        raise InvalidWorkout(f"{label} must be a number")
+    try:
+        number = convert(value)
+    except (ValueError, OverflowError):
+        raise InvalidWorkout(f"{label} must be a number") from None
+    if isinstance(number, int) and abs(number) > SQLITE_MAX_INT:
+        raise InvalidWorkout(f"{label} is out of range")
+    return number
+
+
+def _workout_from_json(data: dict):
+    """(fields, exercises) from a JSON workout; exercises are
+    [{"name", "sets", "reps", "weight_kg"}] ("exercise_name" also accepted).
+
+    Raises InvalidWorkout for a field of the wrong type or an unreadable date.
+    """
+    for name in ("workout_date", "workout_type", "category", "notes"):
+        _json_text(data, name)
+    if data.get("workout_date") and not _parse_date(data["workout_date"]):
+        raise InvalidWorkout("workout_date must be YYYY-MM-DD")
+    for name in ("duration_minutes", "performance_rating", "feeling_rating"):
+        _json_number(data, name, int, name)
+
+    items = data.get("exercises") or []
+    if not isinstance(items, list):
+        raise InvalidWorkout("exercises must be a list")
+    exercises = []
+    for i, ex in enumerate(items):
+        if not isinstance(ex, dict):
+            raise InvalidWorkout(f"exercises[{i}] must be an object")
+        name = (_json_text(ex, "name", f"exercises[{i}].name")
+                or _json_text(ex, "exercise_name", f"exercises[{i}].exercise_name") or "")
+        if name.strip():
+            exercises.append((
+                name.strip(),
+                _json_number(ex, "sets", int, f"exercises[{i}].sets"),
+                _json_number(ex, "reps", int, f"exercises[{i}].reps"),
+                _json_number(ex, "weight_kg", float, f"exercises[{i}].weight_kg"),
+            ))
+    return _workout_fields(data), exercises
+
+
+def _interned(conn, exercises: list[tuple]) -> list[tuple]:
+    """(name, sets, reps, weight_kg) -> (exercise_id, sets, reps, weight_kg)."""
+    ids = catalog.resolve(conn, [ex[0] for ex in exercises])
+    return [(ids[ex[0]], *ex[1:]) for ex in exercises]
+
+
+def _sync_exercises(conn, workout_id: int, exercises: list[tuple], is_new: bool = False) -> set:
+    """Make the stored exercise rows of a workout match `exercises`.
+
+    Rows are matched by position (stored rows in id order), so an edit only
+    rewrites the rows that changed, appends new ones and drops the tail. Every
+    group goes out as one executemany inside the caller's transaction.
+    Returns the exercise ids the workout had before the write.
+    """
+    stored = [] if is_new else conn.execute(
+        """SELECT id, exercise_id, sets, reps, weight_kg
+           FROM workout_exercises
+           WHERE workout_id = ?
+           ORDER BY id""",
+        (workout_id,),
+    ).fetchall()
+
+    exercises = _interned(conn, exercises)
+    updates = [
+        (*ex, row["id"])
+        for row, ex in zip(stored, exercises)
+        if tuple(row)[1:] != ex
+    ]
+    inserts = [(workout_id, *ex) for ex in exercises[len(stored):]]
+    deletes = [(row["id"],) for row in stored[len(exercises):]]
+
+    if updates:
+        conn.executemany(
+            """UPDATE workout_exercises
+               SET exercise_id=?, sets=?, reps=?, weight_kg=?
+               WHERE id=?""",
+            updates,
+        )
+    if inserts:
+        conn.executemany(
+            """INSERT INTO workout_exercises
+               (workout_id, exercise_id, sets, reps, weight_kg)
+               VALUES (?, ?, ?, ?, ?)""",
+            inserts,
+        )
+    if deletes:
+        conn.executemany("DELETE FROM workout_exercises WHERE id = ?", deletes)
+    return {row["exercise_id"] for row in stored}
+
+
+def _save_workout(conn, workout_id: int | None, fields: dict, exercises: list[tuple]) -> int | None:
+    """Insert (workout_id=None) or update a workout and its exercises.
+
+    Returns the workout id, or None when updating a workout that no longer
+    exists. The caller owns the transaction and commits.
+    """
+    values = [fields[f] for f in WORKOUT_FIELDS]
+    if workout_id:
+        old = conn.execute("SELECT workout_date FROM workouts WHERE id=?", (workout_id,)).fetchone()
+        if old is None:
+            return None
+        conn.execute(
+            """UPDATE workouts
+               SET workout_date=?, workout_type=?, category=?, duration_minutes=?,
+                   performance_rating=?, feeling_rating=?, notes=?,
+                   row_version = row_version + 1
+               WHERE id=?""",
+            (*values, workout_id),
+        )
+        old_exercise_ids = _sync_exercises(conn, workout_id, exercises)
+        records.apply_workout(conn, workout_id, old_exercise_ids)
+        rollups.refresh_days(conn, {old["workout_date"], fields["workout_date"]})
+        search.refresh_workouts(conn, [workout_id])
+    else:
+        workout_id = conn.execute(_INSERT_WORKOUT_SQL, values).lastrowid
+        _sync_exercises(conn, workout_id, exercises, is_new=True)
+        records.apply_workout(conn, workout_id, ())
+        rollups.refresh_days(conn, {fields["workout_date"]})
+        search.refresh_workouts(conn, [workout_id])
+    return workout_id
+
+
+def _bulk_insert_workouts(conn, batch: list[tuple[dict, list[tuple]]]) -> list[int]:
+    """Insert many new (fields, exercises) workouts in the caller's transaction.
+
+    Same result as calling _save_workout() for each, but the ids are assigned
+    up front so workouts and exercises each go out in one executemany, and
+    the derived tables are updated once per batch.
+    """
+    names = {ex[0] for _fields, exercises in batch for ex in exercises}
+    exercise_ids = catalog.resolve(conn, names)
+    # AUTOINCREMENT never reuses an id, so continue after the highest ever issued
+    last_id = conn.execute(
+        """SELECT MAX(COALESCE(MAX(id), 0),
+                      COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'workouts'), 0))
+           FROM workouts"""
+    ).fetchone()[0]
+    ids = list(range(last_id + 1, last_id + 1 + len(batch)))
+    conn.executemany(
+        _INSERT_WORKOUT_WITH_ID_SQL,
+        [(workout_id, *(fields[f] for f in WORKOUT_FIELDS))
+         for workout_id, (fields, _exercises) in zip(ids, batch)],
+    )
+    conn.executemany(
+        """INSERT INTO workout_exercises
+           (workout_id, exercise_id, sets, reps, weight_kg)
+           VALUES (?, ?, ?, ?, ?)""",
+        [(workout_id, exercise_ids[ex[0]], *ex[1:])
+         for workout_id, (_fields, exercises) in zip(ids, batch) for ex in exercises],
+    )
+    records.apply_new_workouts(conn, ids)
+    rollups.refresh_days(conn, {fields["workout_date"] for fields, _ in batch})
+    search.refresh_workouts(conn, ids)
+    return ids
+
+
+def _delete_workout(conn, workout_id: int) -> bool:
+    old = conn.execute("SELECT workout_date FROM workouts WHERE id=?", (workout_id,)).fetchone()
+    if old is None:
+        return False
+    old_exercise_ids = [r[0] for r in conn.execute(
+        "SELECT DISTINCT exercise_id FROM workout_exercises WHERE workout_id = ?", (workout_id,)
+    ).fetchall()]
+    conn.execute("DELETE FROM workout_exercises WHERE workout_id = ?", (workout_id,))
+    conn.execute("DELETE FROM workouts WHERE id = ?", (workout_id,))
+    records.apply_workout(conn, workout_id, old_exercise_ids)
+    rollups.refresh_days(conn, {old["workout_date"]})
+    search.refresh_workouts(conn, [workout_id])
+    return True
+
+
+@progress_bp.route("", methods=["GET", "POST"])
+def page():
     edit_id_raw = request.args.get("edit")
     edit_id = None
     try:
@@ -104,89 +498,18 @@ def page():
             edit_id = int(edit_id_raw)
     except:
         edit_id = None
+    if edit_id is not None and abs(edit_id) > SQLITE_MAX_INT:
+        edit_id = None
 
     if request.method == "POST":
         # If hidden workout_id is present -> update, else insert
-        workout_id_raw = request.form.get("workout_id")
-        workout_id = None
         try:
-            if workout_id_raw:
-                workout_id = int(workout_id_raw)
-        except:
-            workout_id = None
+            workout_id, fields, exercises = _workout_from_form(request.form)
+        except InvalidWorkout as exc:
+            return jsonify({"error": str(exc)}), 400
 
-        workout_type = request.form.get("workout_type") or "Strength (Upper)"
-        category = (request.form.get("category") or "").strip() or _derive_category(workout_type)
-        duration_minutes = request.form.get("duration_minutes") or None
-        notes = (request.form.get("notes") or "").strip()
-        workout_date = _parse_date(request.form.get("workout_date")) or date.today().isoformat()
-
-        performance_rating = to_int(request.form.get("performance_rating"), None)
-        feeling_rating = to_int(request.form.get("feeling_rating"), None)
-
-        names = request.form.getlist("exercise_name[]")
-        sets_list = request.form.getlist("sets[]")
-        reps_list = request.form.getlist("reps[]")
-        weights_list = request.form.getlist("weight_kg[]")
-
-        with get_db() as conn:
-            if workout_id:  # UPDATE
-                conn.execute(
-                    """UPDATE workouts
-                       SET workout_date=?, workout_type=?, category=?, duration_minutes=?,
-                           performance_rating=?, feeling_rating=?, notes=?
-                       WHERE id=?""",
-                    (
-                        workout_date,
-                        workout_type,
-                        category,
-                        duration_minutes,
-                        performance_rating,
-                        feeling_rating,
-                        notes,
-                        workout_id,
-                    ),
-                )
-
-                
-                #? е placeholder (parameter marker) в SQLite
-                conn.execute("DELETE FROM workout_exercises WHERE workout_id = ?", (workout_id,))
-
-                for i, name in enumerate(names):
-                    name = (name or "").strip()
-                    if not name:
-                        continue
-                    s = to_int(sets_list[i] if i < len(sets_list) else None, None)
-                    r = to_int(reps_list[i] if i < len(reps_list) else None, None)
-                    w = to_float(weights_list[i] if i < len(weights_list) else None, None)
-                    conn.execute(
-                        """INSERT INTO workout_exercises (workout_id, exercise_name, sets, reps, weight_kg)
-                           VALUES (?, ?, ?, ?, ?)""",
-                        (workout_id, name, s, r, w),
-                    )
-
-            else:  
-                cur = conn.execute(
-                    """INSERT INTO workouts (workout_date, workout_type, category, duration_minutes, performance_rating, feeling_rating, notes)
-                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (workout_date, workout_type, category, duration_minutes, performance_rating, feeling_rating, notes),
-                )
-                new_id = cur.lastrowid
-
-                for i, name in enumerate(names):
-                    name = (name or "").strip()
-                    if not name:
-                        continue
-                    s = to_int(sets_list[i] if i < len(sets_list) else None, None)
-                    r = to_int(reps_list[i] if i < len(reps_list) else None, None)
-                    w = to_float(weights_list[i] if i < len(weights_list) else None, None)
-                    conn.execute(
-                        """INSERT INTO workout_exercises (workout_id, exercise_name, sets, reps, weight_kg)
-                           VALUES (?, ?, ?, ?, ?)""",
-                        (new_id, name, s, r, w),
-                    )
-
-            conn.commit()
+        db.run_write(lambda conn: _save_workout(conn, workout_id, fields, exercises))
+        _forget_card(workout_id)
 
         return redirect(url_for("progress.page"))
 
@@ -194,53 +517,21 @@ def page():
     period = request.args.get("period", "week")
     category_f = (request.args.get("category") or "").strip()
     date_from, date_to = _compute_period(period)
-    order_by = "workout_date DESC, id DESC"
 
     with get_db() as conn:
-        categories = [r[0] for r in conn.execute(
-            "SELECT DISTINCT COALESCE(category, '') FROM workouts WHERE COALESCE(category,'') <> '' ORDER BY 1"
-        ).fetchall()]
-        if not categories:
-            categories = ["Strength", "Cardio", "HIIT", "Mobility", "General"]
-        else:
-            for c in ["Strength", "Cardio", "HIIT", "Mobility", "General"]:
-                if c not in categories:
-                    categories.append(c)
+        categories = _list_categories(conn)
 
         where = ["workout_date BETWEEN ? AND ?"]
         params = [date_from, date_to]
         if category_f:
-            where.append("COALESCE(category,'') = ?")
+            where.append("category = ?")
             params.append(category_f)
 
-        recent = conn.execute(
-            f"""
-            SELECT w.id, w.workout_date, w.workout_type, w.category,
-                   w.duration_minutes, w.performance_rating, w.feeling_rating, w.notes
-            FROM workouts w
-            WHERE {' AND '.join(where)}
-            ORDER BY {order_by}
-            LIMIT 50
-            """,
-            params,
-        ).fetchall()
+        recent = conn.execute(_listing_sql(where), [*params, RECENT_LIMIT]).fetchall()
+        next_cursor = _encode_cursor(recent[-1]) if len(recent) == RECENT_LIMIT else None
 
-        # load exercises for list
-        recent_ex = {}
-        if recent:
-            ids = [r["id"] for r in recent]
-            q_marks = ",".join(["?"] * len(ids))
-            ex_rows = conn.execute(
-                f"""
-                SELECT workout_id, exercise_name, sets, reps, weight_kg
-                FROM workout_exercises
-                WHERE workout_id IN ({q_marks})
-                ORDER BY workout_id DESC, id ASC
-                """,
-                ids,
-            ).fetchall()
-            for ex in ex_rows:
-                recent_ex.setdefault(ex["workout_id"], []).append(ex)
+        # exercises are only loaded for cards that aren't cached
+        cards = _workout_cards(recent, lambda ids: _load_exercises(conn, ids))
 
         # optional edit payload
         edit_workout = None
@@ -254,10 +545,11 @@ def page():
             ).fetchone()
             if edit_workout:
                 edit_exercises = conn.execute(
-                    """SELECT exercise_name, sets, reps, weight_kg
-                       FROM workout_exercises
-                       WHERE workout_id=?
-                       ORDER BY id ASC""",
+                    """SELECT x.name AS exercise_name, e.sets, e.reps, e.weight_kg
+                       FROM workout_exercises e
+                       JOIN exercises x ON x.id = e.exercise_id
+                       WHERE e.workout_id=?
+                       ORDER BY e.id ASC""",
                     (edit_id,),
                 ).fetchall()
 
@@ -267,17 +559,413 @@ def page():
         workout_templates=WORKOUT_TEMPLATES,
         categories=categories,
         filters={"period": period, "category": category_f},
+        date_from=date_from,
+        date_to=date_to,
         recent=recent,
-        recent_ex=recent_ex,
+        next_cursor=next_cursor,
+        cards=cards,
         edit_workout=edit_workout,
         edit_exercises=edit_exercises,
     )
 
 
+@progress_bp.route("/api/workouts", methods=["GET"])
+def api_workouts():
+    """Keyset-paginated history, newest first.
+
+    `cursor` is the opaque "date,id" of the last workout already shown; the next
+    page is everything strictly before it in (workout_date, id) order.
+    """
+    try:
+        limit = min(max(int(request.args.get("limit", RECENT_LIMIT)), 1), 200)
+    except ValueError:
+        limit = RECENT_LIMIT
+    date_from = _parse_date(request.args.get("from")) or "0000-01-01"
+    date_to = _parse_date(request.args.get("to")) or "9999-12-31"
+    category_f = (request.args.get("category") or "").strip()
+
+    where = ["workout_date BETWEEN ? AND ?"]
+    params = [date_from, date_to]
+    if category_f:
+        where.append("category = ?")
+        params.append(category_f)
+
+    raw_cursor = request.args.get("cursor")
+    cursor = _decode_cursor(raw_cursor)
+    if raw_cursor and cursor is None:
+        return jsonify({"error": "invalid cursor"}), 400
+    if cursor:
+        # pull the range's upper bound down to the cursor so the index seek
+        # starts there instead of skipping every newer row
+        params[1] = min(date_to, cursor[0])
+        where.append("(workout_date, id) < (?, ?)")
+        params.extend(cursor)
+
+    with get_db() as conn:
+        # one extra row tells us whether another page exists
+        rows = conn.execute(_listing_sql(where), [*params, limit + 1]).fetchall()
+        page_rows = rows[:limit]
+        exercises = _load_exercises(conn, [r["id"] for r in page_rows])
+    cards = _workout_cards(page_rows, lambda _ids: exercises)
+
+    workouts = [
+        _workout_json(w, exercises.get(w["id"], []), card)
+        for w, card in zip(page_rows, cards)
+    ]
+
+    return jsonify({
+        "workouts": workouts,
+        "next_cursor": _encode_cursor(page_rows[-1]) if len(rows) > limit else None,
+    })
+
+
+def _workout_json(w, ex_list, card) -> dict:
+    return {
+        **dict(w),
+        "exercises": [
+            {k: ex[k] for k in ("exercise_name", "sets", "reps", "weight_kg")}
+            for ex in ex_list
+        ],
+        "html": card,
+    }
+
+
+def _saved_workout_response(workout_id: int | None, status: int = 200):
+    """The workout as the listing shows it: one row and its exercises, plus the card."""
+    if workout_id is None:
+        return jsonify({"error": "workout not found"}), 404
+    with get_db() as conn:
+        w = conn.execute(_listing_sql(["w.id = ?"]), (workout_id, 1)).fetchone()
+        exercises = _load_exercises(conn, [workout_id]) if w else {}
+    if w is None:  # deleted again before we read it back
+        return jsonify({"error": "workout not found"}), 404
+    card = _workout_cards([w], lambda _ids: exercises)[0]
+    return jsonify({"workout": _workout_json(w, exercises.get(workout_id, []), card)}), status
+
+
+def _json_body():
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+
+@progress_bp.route("/api/workouts", methods=["POST"])
+def api_create_workout():
+    """Create a workout from a JSON object; responds 201 with the stored workout."""
+    data = _json_body()
+    if data is None:
+        return jsonify({"error": "expected a JSON object"}), 400
+    try:
+        fields, exercises = _workout_from_json(data)
+    except InvalidWorkout as exc:
+        return jsonify({"error": str(exc)}), 400
+    workout_id = db.run_write(lambda conn: _save_workout(conn, None, fields, exercises))
+    return _saved_workout_response(workout_id, 201)
+
+
+@progress_bp.route("/api/workouts/<int:workout_id>", methods=["PUT"])
+def api_update_workout(workout_id: int):
+    """Replace a workout and its exercises; responds with the stored workout."""
+    data = _json_body()
+    if data is None:
+        return jsonify({"error": "expected a JSON object"}), 400
+    try:
+        fields, exercises = _workout_from_json(data)
+    except InvalidWorkout as exc:
+        return jsonify({"error": str(exc)}), 400
+    saved = db.run_write(lambda conn: _save_workout(conn, workout_id, fields, exercises))
+    _forget_card(workout_id)
+    return _saved_workout_response(saved)
+
+
+@progress_bp.route("/api/workouts/<int:workout_id>", methods=["DELETE"])
+def api_delete_workout(workout_id: int):
+    deleted = db.run_write(lambda conn: _delete_workout(conn, workout_id))
+    _forget_card(workout_id)
+    if not deleted:
+        return jsonify({"error": "workout not found"}), 404
+    return jsonify({"deleted": workout_id})
+
+
+def _insert_synced(conn, items: list[tuple[str, dict, list[tuple]]]) -> dict:
+    """Insert new (key, fields, exercises) items inside a savepoint: all or none."""
+    conn.execute("SAVEPOINT sync_items")
+    try:
+        ids = _bulk_insert_workouts(conn, [(f, e) for _key, f, e in items])
+        conn.executemany(
+            "INSERT INTO sync_keys (key, workout_id) VALUES (?, ?)",
+            [(key, workout_id) for (key, _f, _e), workout_id in zip(items, ids)],
+        )
+    except BaseException:
+        conn.execute("ROLLBACK TO sync_items")
+        conn.execute("RELEASE sync_items")
+        raise
+    conn.execute("RELEASE sync_items")
+    return {key: (workout_id, True) for (key, _f, _e), workout_id in zip(items, ids)}
+
+
+def _sync_workouts(conn, items: list[tuple[str, dict, list[tuple]]]) -> tuple[dict, dict]:
+    """Insert the (key, fields, exercises) items whose key hasn't been seen.
+
+    Returns ({key: (workout_id, created)}, {key: error}). The new items are
+    inserted together; if that fails they are retried one by one, so an item
+    the database rejects is reported on its own and the rest still commit.
+    """
+    keys = [key for key, _fields, _exercises in items]
+    q_marks = ",".join(["?"] * len(keys))
+    synced = {
+        key: (workout_id, False)
+        for key, workout_id in conn.execute(
+            f"SELECT key, workout_id FROM sync_keys WHERE key IN ({q_marks})", keys
+        ).fetchall()
+    }
+    new = [(key, fields, exercises) for key, fields, exercises in items if key not in synced]
+    if not new:
+        return synced, {}
+    try:
+        return {**synced, **_insert_synced(conn, new)}, {}
+    except (sqlite3.Error, ValueError, OverflowError):
+        pass  # find the items at fault below
+    failed = {}
+    for item in new:
+        try:
+            synced.update(_insert_synced(conn, [item]))
+        except (sqlite3.Error, ValueError, OverflowError) as exc:
+            failed[item[0]] = f"could not be saved: {exc}"
+    return synced, failed
+
+
+@progress_bp.route("/api/sync", methods=["POST"])
+def api_sync():
+    """Upload workouts queued offline: {"workouts": [{"key": ..., <workout>}, ...]}.
+
+    `key` is generated by the client once per workout; a key the server
+    already has is answered with the stored workout id instead of inserting
+    again, so retrying a sync whose response was lost is safe. Valid items
+    are written in one transaction; invalid ones, and any the database
+    rejects, are listed in `errors` so the client can drop them.
+    """
+    data = _json_body()
+    items = data.get("workouts") if data else None
+    if not isinstance(items, list):
+        return jsonify({"error": 'expected {"workouts": [...]}'}), 400
+    if len(items) > MAX_SYNC_BATCH:
+        return jsonify({"error": f"at most {MAX_SYNC_BATCH} workouts per sync"}), 413
+
+    batch, errors, indexes = [], [], {}
+    for index, item in enumerate(items):
+        key = item.get("key") if isinstance(item, dict) else None
+        if not isinstance(key, str) or not 0 < len(key) <= MAX_SYNC_KEY_LENGTH:
+            errors.append({"index": index, "key": key if isinstance(key, str) else None,
+                           "error": "missing or invalid key"})
+            continue
+        if key in indexes:  # the same workout queued twice: keep the first
+            continue
+        indexes[key] = index
+        try:
+            batch.append((key, *_workout_from_json(item)))
+        except InvalidWorkout as exc:
+            # reported against its key, so the client drops it from its queue
+            errors.append({"index": index, "key": key, "error": str(exc)})
+
+    synced, failed = {}, {}
+    if batch:
+        synced, failed = db.run_write(lambda conn: _sync_workouts(conn, batch))
+    for key, error in failed.items():
+        errors.append({"index": indexes[key], "key": key, "error": error})
+
+    created = [workout_id for workout_id, is_new in synced.values() if is_new]
+    cards = {}
+    if created:
+        with get_db() as conn:
+            rows = conn.execute(
+                _listing_sql([f"w.id IN ({','.join(['?'] * len(created))})"]),
+                [*created, len(created)],
+            ).fetchall()
+            exercises = _load_exercises(conn, created)
+        for w, card in zip(rows, _workout_cards(rows, lambda _ids: exercises)):
+            cards[w["id"]] = _workout_json(w, exercises.get(w["id"], []), card)
+
+    results = []
+    for key, _fields, _exercises in batch:
+        if key in failed:
+            continue
+        workout_id, is_new = synced[key]
+        status = "created" if is_new else "duplicate"
+        result = {"key": key, "workout_id": workout_id, "status": status}
+        if workout_id in cards:
+            result["workout"] = cards[workout_id]
+        results.append(result)
+    return jsonify({"results": results, "errors": errors})
+
+
+@progress_bp.route("/api/rollups", methods=["GET"])
+def api_rollups():
+    """Dashboard totals from the rollup tables: ?grain=day|week&from=&to=&category="""
+    grain = "week" if request.args.get("grain") == "week" else "day"
+    date_to = _parse_date(request.args.get("to")) or date.today().isoformat()
+    # 12 weeks back by default, clamped to the first representable day
+    date_from = _parse_date(request.args.get("from")) or date.fromordinal(
+        max(date.fromisoformat(date_to).toordinal() - 83, 1)
+    ).isoformat()
+    category_f = (request.args.get("category") or "").strip()
+
+    with get_db() as conn:
+        rows = rollups.fetch(conn, grain, date_from, date_to, category_f)
+
+    return jsonify({
+        "grain": grain,
+        "from": date_from,
+        "to": date_to,
+        "rows": [dict(r) for r in rows],
+    })
+
+
+@progress_bp.route("/api/analytics", methods=["GET"])
+def api_analytics():
+    """Totals over ?from=&to= per ?grain=day|week|month|year (&category=),
+    compared with the previous equivalent range.
+
+    Without `from`/`to` the range is the current day/week/month/year; with
+    only `to`, it starts at the beginning of the grain period containing `to`.
+    """
+    grain = request.args.get("grain", "day")
+    if grain not in analytics.GRAINS:
+        return jsonify({"error": f"grain must be one of {', '.join(analytics.GRAINS)}"}), 400
+    today = date.today()
+    raw_from, raw_to = request.args.get("from"), request.args.get("to")
+    if (raw_from and not _parse_date(raw_from)) or (raw_to and not _parse_date(raw_to)):
+        return jsonify({"error": "dates must be YYYY-MM-DD"}), 400
+    if raw_from or raw_to:
+        date_to = date.fromisoformat(raw_to) if raw_to else today
+        date_from = (date.fromisoformat(raw_from) if raw_from
+                     else analytics.period_start(date_to, grain))
+    else:
+        date_from = analytics.period_start(today, grain)
+        date_to = analytics.shift(date_from, grain, 1) - timedelta(days=1)
+    if date_from > date_to:
+        return jsonify({"error": "from is after to"}), 400
+    if analytics.bucket_count(date_from, date_to, grain) > analytics.MAX_BUCKETS:
+        return jsonify({"error": f"at most {analytics.MAX_BUCKETS} {grain}s per request"}), 400
+    category_f = (request.args.get("category") or "").strip()
+
+    # A range that ended before today only changes when a workout is back-dated
+    # into it, and every such write bumps data_version, which is in the key.
+    cache = current_app.extensions["analytics_cache"]
+    with get_db() as conn:
+        key = None
+        if date_to < today:
+            key = (db.data_version(conn), grain, date_from, date_to, category_f)
+            result = cache.get(key)
+            if result is not None:
+                return jsonify(result)
+        try:
+            result = analytics.compare(conn, date_from, date_to, grain, category_f)
+        except (OverflowError, ValueError):
+            return jsonify({"error": "range is too close to the limits of the calendar"}), 400
+    if key is not None:
+        cache.put(key, result)
+    return jsonify(result)
+
+
+SEARCH_PAGE_SIZE = 20
+# deepest ?page= served; also keeps the OFFSET within SQLite's integer range
+MAX_SEARCH_PAGE = 1000
+
+# workouts per /progress/api/sync request; also bounds its IN (...) lists
+MAX_SYNC_BATCH = 200
+MAX_SYNC_KEY_LENGTH = 100
+
+
+@progress_bp.route("/search", methods=["GET"])
+def search_workouts():
+    """Full-text search over workout types, notes and exercise names.
+
+    ?q= is free text (the last word matches as a prefix); results are ranked
+    by bm25, with matches wrapped in <mark>. ?page= starts at 1.
+    """
+    text = (request.args.get("q") or "").strip()
+    limit = min(max(_to_int(request.args.get("limit"), SEARCH_PAGE_SIZE), 1), 100)
+    page_no = max(_to_int(request.args.get("page"), 1), 1)
+    if page_no > MAX_SEARCH_PAGE:
+        return jsonify({"error": f"page must be at most {MAX_SEARCH_PAGE}"}), 400
+
+    with get_db() as conn:
+        results, has_more = search.search(conn, text, limit, (page_no - 1) * limit)
+
+    return jsonify({
+        "q": text,
+        "page": page_no,
+        "results": results,
+        "next_page": page_no + 1 if has_more else None,
+    })
+
+
+@progress_bp.route("/records", methods=["GET"])
+def records_page():
+    with get_db() as conn:
+        rows = records.fetch_all(conn)
+    return render_template("records.html", active="progress", records=rows)
+
+
+def _import_format(filename: str | None, content_type: str | None) -> str:
+    fmt = (request.args.get("format") or "").lower()
+    if fmt in ("csv", "jsonl"):
+        return fmt
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson")) or "json" in (content_type or ""):
+        return "jsonl"
+    return "csv"
+
+
+@progress_bp.route("/import", methods=["POST"])
+def import_workouts():
+    """Bulk import: multipart `file` or a raw text/csv / application/x-ndjson body.
+
+    ?format=csv|jsonl overrides detection, ?batch_size= sets the rows per
+    transaction. Responds with the import summary.
+    """
+    from importer import DEFAULT_BATCH_SIZE, import_workouts as run_import
+
+    upload = request.files.get("file")
+    if upload:
+        stream, fmt = upload.stream, _import_format(upload.filename, upload.mimetype)
+    else:
+        stream, fmt = request.stream, _import_format(None, request.mimetype)
+
+    lines = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    batch_size = _to_int(request.args.get("batch_size"), DEFAULT_BATCH_SIZE)
+    summary = run_import(lines, fmt, batch_size)
+    failed = "error" in summary or (summary["skipped"] and not summary["imported"])
+    return jsonify(summary), 400 if failed else 200
+
+
+@progress_bp.cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default=None,
+              help="Defaults to the file extension.")
+@click.option("--batch-size", type=int, default=None, help="Workouts per transaction.")
+def import_command(path, fmt, batch_size):
+    """Import workouts from a history CSV or a JSON lines file."""
+    from importer import DEFAULT_BATCH_SIZE, import_workouts as run_import
+
+    fmt = fmt or ("jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv")
+
+    def report(summary):
+        click.echo(f"batch {summary['batches']}: {summary['imported']} workouts, "
+                   f"{summary['exercises']} exercises, {summary['skipped']} skipped")
+
+    with open(path, encoding="utf-8-sig", newline="") as lines:
+        summary = run_import(lines, fmt, batch_size or DEFAULT_BATCH_SIZE, report)
+
+    for error in summary["errors"]:
+        click.echo(f"skipped: {error['error']}", err=True)
+    click.echo(f"Imported {summary['imported']} workouts in {summary['seconds']}s.")
+    if "error" in summary:
+        raise click.ClickException(summary["error"])
+
+
 @progress_bp.route("/delete/<int:workout_id>", methods=["POST"])
 def delete(workout_id: int):
-    with get_db() as conn:
-        conn.execute("DELETE FROM workout_exercises WHERE workout_id = ?", (workout_id,))
-        conn.execute("DELETE FROM workouts WHERE id = ?", (workout_id,))
-        conn.commit()
+    db.run_write(lambda conn: _delete_workout(conn, workout_id))
+    _forget_card(workout_id)
     return redirect(url_for("progress.page"))
@@ -1,25 +1,34 @@
-from flask import Blueprint, render_template, request, send_file
-import sqlite3
+from flask import (
+    Blueprint, Response, current_app, jsonify, render_template, request, send_file,
+    stream_with_context, url_for,
+)
 from pathlib import Path
 import io
 import csv
+import functools
+import hashlib
 import json
+import threading
+from collections.abc import Mapping
 from typing import List
 
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+import db
+from db import get_db
+from cache import LRUCache
+from jobs import JobQueue, QueueFull
+from routes.progress import _parse_date
 
 
+# reportlab (and the TTF files) are only loaded on the first PDF render, so
+# workers that never export a PDF don't pay for them at boot.
+_fonts_lock = threading.Lock()
+
+
+@functools.cache
 def _register_fonts():
-    
-    try:
-        pdfmetrics.getFont("TrainSphereFont")
-        pdfmetrics.getFont("TrainSphereFont-Bold")
-        return True
-    except Exception:
-        pass
+    """Resolve and register the Unicode fonts once per process."""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
 
     regular_candidates = [
         # Linux
@@ -59,20 +68,38 @@ def _register_fonts():
 
 
 report_bp = Blueprint("report", __name__, url_prefix="/report")
-DB_PATH = Path(__file__).resolve().parents[1] / "trainsphere.db"
 
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def fetch_report(limit_workouts: int = 20):
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "trainsphere_report.csv"),
+    "pdf": ("application/pdf", "trainsphere_report.pdf"),
+}
+
+
+@report_bp.record_once
+def _init_report(state):
+    app = state.app
+    app.extensions["report_cache"] = LRUCache(
+        max_bytes=app.config.get("REPORT_CACHE_BYTES", 32 * 1024 * 1024),
+        sizeof=lambda entry: len(entry[1]),
+    )
+    app.extensions["report_jobs"] = JobQueue(
+        app,
+        app.config.get("REPORT_SPOOL_DIR", Path(app.root_path) / "report_spool"),
+        max_workers=app.config.get("REPORT_JOB_WORKERS", 2),
+        max_pending=app.config.get("REPORT_JOB_MAX_PENDING", 16),
+        max_artifacts=app.config.get("REPORT_MAX_ARTIFACTS", 20),
+    )
+    if app.config.get("REPORT_PRELOAD_FONTS"):
+        with _fonts_lock:
+            _register_fonts()
+
+
+def fetch_report(limit_workouts: int | None = 20):
     """Fetch data needed for exports.
 
     We keep Profile + Plan as the latest rows.
-    For Progress we export multiple workouts 
+    For Progress we export multiple workouts (limit_workouts=None -> all of them)
     """
     with get_db() as conn:
         profile = conn.execute(
@@ -89,18 +116,26 @@ def fetch_report(limit_workouts: int = 20):
                FROM workouts
                ORDER BY id DESC
                LIMIT ?""",
-            (limit_workouts,),
+            (-1 if limit_workouts is None else limit_workouts,),
         ).fetchall()
 
-        exercises_by_workout = {}
-        for w in workouts:
-            exercises_by_workout[w["id"]] = conn.execute(
-                """SELECT exercise_name, sets, reps, weight_kg
-                   FROM workout_exercises
-                   WHERE workout_id=?
-                   ORDER BY id""",
-                (w["id"],),
-            ).fetchall()
+        exercises_by_workout: dict[int, list] = {w["id"]: [] for w in workouts}
+        if workouts:
+            # the full history would overflow SQLite's bound-variable limit
+            # as an IN list, so it reads every exercise row instead
+            where, params = "1", []
+            if limit_workouts is not None:
+                params = list(exercises_by_workout)
+                where = f"e.workout_id IN ({','.join(['?'] * len(params))})"
+            for ex in conn.execute(
+                f"""SELECT e.workout_id, x.name AS exercise_name, e.sets, e.reps, e.weight_kg
+                    FROM workout_exercises e
+                    JOIN exercises x ON x.id = e.exercise_id
+                    WHERE {where}
+                    ORDER BY e.workout_id, e.id""",
+                params,
+            ).fetchall():
+                exercises_by_workout[ex["workout_id"]].append(ex)
 
     # Parse checked checklist / quick notes (stored as JSON arrays)
     checklist: list[str] = []
@@ -119,237 +154,394 @@ def fetch_report(limit_workouts: int = 20):
     return profile, plan, workouts, exercises_by_workout, checklist, quick_notes
 
 
-@report_bp.route("", methods=["GET"])
-def page():
-    return render_template("report.html", active="report")
-
-
-@report_bp.route("/export", methods=["GET"])
-def export():
-    format = (request.args.get("format") or "none").lower()
-    profile, plan, workouts, exercises_by_workout, checklist, quick_notes = fetch_report()
-
-    if format == "csv":
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        writer.writerow(["TrainSphere Report"])
-        writer.writerow([])
-
-        writer.writerow(["PROFILE"])
-        if profile:
-            writer.writerow(["Name", profile["name"]])
-            writer.writerow(["Age", profile["age"]])
-            writer.writerow(["Height_cm", profile["height_cm"]])
-            writer.writerow(["Weight_kg", profile["weight_kg"]])
-            writer.writerow(["Goal_text", profile["goal_text"]])
-            writer.writerow(["Goal_weight_kg", profile["goal_weight_kg"]])
-        else:
-            writer.writerow(["No profile data"])
-
-        writer.writerow([])
-        writer.writerow(["PLAN"])
-        if plan:
-            writer.writerow(["Workout_type", plan["workout_type"]])
-            writer.writerow(["Frequency_per_week", plan["frequency_per_week"]])
-            writer.writerow(["Goal_type", plan["goal_type"]])
-            writer.writerow(["Goal_value", plan["goal_value"]])
-        else:
-            writer.writerow(["No plan data"])
-
-        writer.writerow([])
-        writer.writerow(["CHECKLIST"])
-        if checklist:
-            for item in checklist:
-                writer.writerow([item])
-        else:
-            writer.writerow(["(none)"])
-
-        writer.writerow([])
-        writer.writerow(["QUICK NOTES"])
-        if quick_notes:
-            for item in quick_notes:
-                writer.writerow([item])
-        else:
-            writer.writerow(["(none)"])
-
-        writer.writerow([])
-        writer.writerow(["WORKOUTS (latest first)"])
-        if workouts:
+HISTORY_CSV_HEADER = [
+    "Workout_id",
+    "Date",
+    "Type",
+    "Category",
+    "Duration_minutes",
+    "Performance_rating",
+    "Feeling_rating",
+    "Notes",
+    "Exercise",
+    "Sets",
+    "Reps",
+    "Weight_kg",
+]
+
+# one row per exercise (workouts without exercises get one row with blanks),
+# walked newest first straight off idx_workouts_date + idx_workout_exercises_workout
+HISTORY_SQL = """
+    SELECT w.id, w.workout_date, w.workout_type, w.category, w.duration_minutes,
+           w.performance_rating, w.feeling_rating, w.notes,
+           x.name AS exercise_name, e.sets, e.reps, e.weight_kg
+    FROM workouts w
+    LEFT JOIN workout_exercises e ON e.workout_id = w.id
+    LEFT JOIN exercises x ON x.id = e.exercise_id
+    WHERE w.workout_date BETWEEN ? AND ?
+    ORDER BY w.workout_date DESC, w.id DESC, e.id
+"""
+db.register_hot_query("report.history_csv", HISTORY_SQL, ("0000-01-01", "9999-12-31"))
+
+STREAM_BATCH_ROWS = 500
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def stream_history_csv(date_from: str, date_to: str):
+    """Yield the flat history CSV in ~64 KB chunks from a single cursor.
+
+    Memory stays constant: rows are pulled in batches and the text buffer is
+    drained every time it passes STREAM_CHUNK_BYTES.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def drain() -> bytes:
+        data = buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate(0)
+        return data
+
+    buf.write("\ufeff")  # BOM so Excel detects UTF-8, same as the regular export
+    writer.writerow(HISTORY_CSV_HEADER)
+
+    cur = get_db().execute(HISTORY_SQL, (date_from, date_to))
+    while True:
+        rows = cur.fetchmany(STREAM_BATCH_ROWS)
+        if not rows:
+            break
+        writer.writerows(rows)
+        if buf.tell() >= STREAM_CHUNK_BYTES:
+            yield drain()
+    cur.close()
+    yield drain()
+
+
+def render_csv(report) -> bytes:
+    """Build the CSV report for a fetch_report() result."""
+    profile, plan, workouts, exercises_by_workout, checklist, quick_notes = report
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    writer.writerow(["TrainSphere Report"])
+    writer.writerow([])
+
+    writer.writerow(["PROFILE"])
+    if profile:
+        writer.writerow(["Name", profile["name"]])
+        writer.writerow(["Age", profile["age"]])
+        writer.writerow(["Height_cm", profile["height_cm"]])
+        writer.writerow(["Weight_kg", profile["weight_kg"]])
+        writer.writerow(["Goal_text", profile["goal_text"]])
+        writer.writerow(["Goal_weight_kg", profile["goal_weight_kg"]])
+    else:
+        writer.writerow(["No profile data"])
+
+    writer.writerow([])
+    writer.writerow(["PLAN"])
+    if plan:
+        writer.writerow(["Workout_type", plan["workout_type"]])
+        writer.writerow(["Frequency_per_week", plan["frequency_per_week"]])
+        writer.writerow(["Goal_type", plan["goal_type"]])
+        writer.writerow(["Goal_value", plan["goal_value"]])
+    else:
+        writer.writerow(["No plan data"])
+
+    writer.writerow([])
+    writer.writerow(["CHECKLIST"])
+    if checklist:
+        for item in checklist:
+            writer.writerow([item])
+    else:
+        writer.writerow(["(none)"])
+
+    writer.writerow([])
+    writer.writerow(["QUICK NOTES"])
+    if quick_notes:
+        for item in quick_notes:
+            writer.writerow([item])
+    else:
+        writer.writerow(["(none)"])
+
+    writer.writerow([])
+    writer.writerow(["WORKOUTS (latest first)"])
+    if workouts:
+        writer.writerow([
+            "Workout_id",
+            "Date",
+            "Type",
+            "Duration_minutes",
+            "Performance_rating",
+            "Feeling_rating",
+            "Notes",
+        ])
+        for w in workouts:
             writer.writerow([
-                "Workout_id",
-                "Date",
-                "Type",
-                "Duration_minutes",
-                "Performance_rating",
-                "Feeling_rating",
-                "Notes",
+                w["id"],
+                w["workout_date"],
+                w["workout_type"],
+                w["duration_minutes"],
+                w["performance_rating"],
+                w["feeling_rating"],
+                w["notes"],
             ])
-            for w in workouts:
-                writer.writerow([
-                    w["id"],
-                    w["workout_date"],
-                    w["workout_type"],
-                    w["duration_minutes"],
-                    w["performance_rating"],
-                    w["feeling_rating"],
-                    w["notes"],
-                ])
-        else:
-            writer.writerow(["No workout data"])
+    else:
+        writer.writerow(["No workout data"])
 
-        writer.writerow([])
-        writer.writerow(["EXERCISES"])
-        writer.writerow(["Workout_id", "Exercise", "Sets", "Reps", "Weight_kg"])
-        for w in workouts:
-            for ex in exercises_by_workout.get(w["id"], []):
-                writer.writerow([w["id"], ex["exercise_name"], ex["sets"], ex["reps"], ex["weight_kg"]])
+    writer.writerow([])
+    writer.writerow(["EXERCISES"])
+    writer.writerow(["Workout_id", "Exercise", "Sets", "Reps", "Weight_kg"])
+    for w in workouts:
+        for ex in exercises_by_workout.get(w["id"], []):
+            writer.writerow([w["id"], ex["exercise_name"], ex["sets"], ex["reps"], ex["weight_kg"]])
 
+    #important for the download to have UTF-8 so Excel recognizes encoding and shows non-ASCII chars correctly
+    return output.getvalue().encode("utf-8-sig")
 
-        #important for the download to have UTF-8 so Excel recognizes encoding and shows non-ASCII chars correctly
-        mem = io.BytesIO(output.getvalue().encode("utf-8-sig"))
-        mem.seek(0)
-        return send_file(
-            mem,
-            mimetype="text/csv",
-            as_attachment=True,
-            download_name="trainsphere_report.csv",
-        )
 
-    if format == "pdf":
+def render_pdf(out, report) -> None:
+    """Draw the PDF report for a fetch_report() result into `out`."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    profile, plan, workouts, exercises_by_workout, checklist, quick_notes = report
+    with _fonts_lock:
         has_unicode = _register_fonts()
-        mem = io.BytesIO()
-        canva = canvas.Canvas(mem, pagesize=A4)
-        width, height = A4
-
-        font = "TrainSphereFont" if has_unicode else "Helvetica"
-        font_bold = "TrainSphereFont-Bold" if has_unicode else "Helvetica-Bold"
-
-        y = height - 60
-        canva.setFont(font_bold, 18)
-        canva.drawString(50, y, "TrainSphere Report")
-        y -= 30
-
-        canva.setFont(font_bold, 12)
-        canva.drawString(50, y, "PROFILE")
-        y -= 18
-        canva.setFont(font, 11)
-
-        if profile:
-            lines = [
-                f"Name: {profile['name']}",
-                f"Age: {profile['age']}",
-                f"Height (cm): {profile['height_cm']}",
-                f"Weight (kg): {profile['weight_kg']}",
-                f"Goal: {profile['goal_text']}",
-                f"Goal weight (kg): {profile['goal_weight_kg']}",
-            ]
-        else:
-            lines = ["No profile data"]
-
-        for line in lines:
-            canva.drawString(50, y, line)
-            y -= 15
-
-        y -= 10
-        canva.setFont(font_bold, 12)
-        canva.drawString(50, y, "PLAN")
-        y -= 18
-        canva.setFont(font, 11)
-
-        if plan:
-            lines = [
-                f"Workout type: {plan['workout_type']}",
-                f"Frequency / week: {plan['frequency_per_week']}",
-                f"Goal type: {plan['goal_type']}",
-                f"Goal value: {plan['goal_value']}",
-            ]
-        else:
-            lines = ["No plan data"]
-
-        for line in lines:
-            canva.drawString(50, y, line)
-            y -= 15
-
-        y -= 10
-        canva.setFont(font_bold, 12)
-        canva.drawString(50, y, "CHECKLIST")
-        y -= 18
-        canva.setFont(font, 11)
-        if checklist:
-            for item in checklist:
-                canva.drawString(60, y, f"- {item}")
-                y -= 14
-        else:
-            canva.drawString(60, y, "- (none)")
+    # invariant: same data -> byte-identical PDF, so ETags agree across workers
+    canva = canvas.Canvas(out, pagesize=A4, invariant=1)
+    width, height = A4
+
+    font = "TrainSphereFont" if has_unicode else "Helvetica"
+    font_bold = "TrainSphereFont-Bold" if has_unicode else "Helvetica-Bold"
+
+    y = height - 60
+    canva.setFont(font_bold, 18)
+    canva.drawString(50, y, "TrainSphere Report")
+    y -= 30
+
+    canva.setFont(font_bold, 12)
+    canva.drawString(50, y, "PROFILE")
+    y -= 18
+    canva.setFont(font, 11)
+
+    if profile:
+        lines = [
+            f"Name: {profile['name']}",
+            f"Age: {profile['age']}",
+            f"Height (cm): {profile['height_cm']}",
+            f"Weight (kg): {profile['weight_kg']}",
+            f"Goal: {profile['goal_text']}",
+            f"Goal weight (kg): {profile['goal_weight_kg']}",
+        ]
+    else:
+        lines = ["No profile data"]
+
+    for line in lines:
+        canva.drawString(50, y, line)
+        y -= 15
+
+    y -= 10
+    canva.setFont(font_bold, 12)
+    canva.drawString(50, y, "PLAN")
+    y -= 18
+    canva.setFont(font, 11)
+
+    if plan:
+        lines = [
+            f"Workout type: {plan['workout_type']}",
+            f"Frequency / week: {plan['frequency_per_week']}",
+            f"Goal type: {plan['goal_type']}",
+            f"Goal value: {plan['goal_value']}",
+        ]
+    else:
+        lines = ["No plan data"]
+
+    for line in lines:
+        canva.drawString(50, y, line)
+        y -= 15
+
+    y -= 10
+    canva.setFont(font_bold, 12)
+    canva.drawString(50, y, "CHECKLIST")
+    y -= 18
+    canva.setFont(font, 11)
+    if checklist:
+        for item in checklist:
+            canva.drawString(60, y, f"- {item}")
             y -= 14
-
-        y -= 8
-        canva.setFont(font_bold, 12)
-        canva.drawString(50, y, "QUICK NOTES")
-        y -= 18
-        canva.setFont(font, 11)
-        if quick_notes:
-            for item in quick_notes:
-                canva.drawString(60, y, f"- {item}")
-                y -= 14
-        else:
-            canva.drawString(60, y, "- (none)")
+    else:
+        canva.drawString(60, y, "- (none)")
+        y -= 14
+
+    y -= 8
+    canva.setFont(font_bold, 12)
+    canva.drawString(50, y, "QUICK NOTES")
+    y -= 18
+    canva.setFont(font, 11)
+    if quick_notes:
+        for item in quick_notes:
+            canva.drawString(60, y, f"- {item}")
             y -= 14
+    else:
+        canva.drawString(60, y, "- (none)")
+        y -= 14
+
+    y -= 10
+    canva.setFont(font_bold, 12)
+    canva.drawString(50, y, "WORKOUTS (latest first)")
+    y -= 18
+    canva.setFont(font, 11)
+
+    if not workouts:
+        canva.drawString(50, y, "No workout data")
+        y -= 15
+    else:
+        for w in workouts:
+            header = f"{w['workout_date']} — {w['workout_type']}"
+            meta = []
+            if w["duration_minutes"]:
+                meta.append(f"{w['duration_minutes']} min")
+            if w["performance_rating"] is not None:
+                meta.append(f"perf {w['performance_rating']}/10")
+            if w["feeling_rating"] is not None:
+                meta.append(f"feel {w['feeling_rating']}/10")
+
+            canva.setFont(font_bold, 11)
+            canva.drawString(50, y, header)
+            y -= 14
+            canva.setFont(font, 11)
+            if meta:
+                canva.drawString(50, y, " · ".join(meta))
+                y -= 14
+            if w["notes"]:
+                canva.drawString(50, y, f"Notes: {w['notes']}")
+                y -= 14
 
-        y -= 10
-        canva.setFont(font_bold, 12)
-        canva.drawString(50, y, "WORKOUTS (latest first)")
-        y -= 18
-        canva.setFont(font, 11)
-
-        if not workouts:
-            canva.drawString(50, y, "No workout data")
-            y -= 15
-        else:
-            for w in workouts:
-                header = f"{w['workout_date']} — {w['workout_type']}"
-                meta = []
-                if w["duration_minutes"]:
-                    meta.append(f"{w['duration_minutes']} min")
-                if w["performance_rating"] is not None:
-                    meta.append(f"perf {w['performance_rating']}/10")
-                if w["feeling_rating"] is not None:
-                    meta.append(f"feel {w['feeling_rating']}/10")
-
-                canva.setFont(font_bold, 11)
-                canva.drawString(50, y, header)
+            ex_list = exercises_by_workout.get(w["id"], [])
+            for ex in ex_list:
+                line = f"- {ex['exercise_name']}  ({ex['sets']}x{ex['reps']}, {ex['weight_kg']}kg)"
+                canva.drawString(60, y, line)
                 y -= 14
+
+            y -= 6
+            if y < 80:
+                canva.showPage()
+                y = height - 60
                 canva.setFont(font, 11)
-                if meta:
-                    canva.drawString(50, y, " · ".join(meta))
-                    y -= 14
-                if w["notes"]:
-                    canva.drawString(50, y, f"Notes: {w['notes']}")
-                    y -= 14
-
-                ex_list = exercises_by_workout.get(w["id"], [])
-                for ex in ex_list:
-                    line = f"- {ex['exercise_name']}  ({ex['sets']}x{ex['reps']}, {ex['weight_kg']}kg)"
-                    canva.drawString(60, y, line)
-                    y -= 14
-
-                y -= 6
-                if y < 80:
-                    canva.showPage()
-                    y = height - 60
-                    canva.setFont(font, 11)
-
-        canva.showPage()
-        canva.save()
-        mem.seek(0)
-
-        return send_file(
-            mem,
-            mimetype="application/pdf",
-            as_attachment=True,
-            download_name="trainsphere_report.pdf",
+
+    canva.showPage()
+    canva.save()
+
+
+def _render_pdf_job(path, limit_workouts=None):
+    with open(path, "wb") as out:
+        render_pdf(out, fetch_report(limit_workouts))
+
+
+def _job_payload(job: dict) -> dict:
+    payload = {k: job[k] for k in ("id", "status", "created_at", "finished_at", "error")}
+    payload["status_url"] = url_for("report.job_status", job_id=job["id"])
+    if job["status"] == "done":
+        payload["download_url"] = url_for("report.job_download", job_id=job["id"])
+    return payload
+
+
+@report_bp.route("/jobs", methods=["POST"])
+def create_job():
+    """Queue a PDF export; poll status_url until it reports "done"."""
+    data = request.get_json(silent=True) if request.is_json else request.form
+    if not isinstance(data, Mapping):
+        return jsonify({"error": "expected a JSON object"}), 400
+    fmt = data.get("format") or "pdf"
+    if not isinstance(fmt, str) or fmt.lower() != "pdf":
+        return jsonify({"error": "only pdf exports run as jobs"}), 400
+    try:
+        limit = int(data.get("limit") or 0) or None  # 0 / missing -> full history
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    try:
+        job = current_app.extensions["report_jobs"].submit(
+            _render_pdf_job, ".pdf", {"limit_workouts": limit}
         )
+    except QueueFull:
+        error = {"error": "export queue is full, try again shortly"}
+        return jsonify(error), 503, {"Retry-After": "5"}
+    return jsonify(_job_payload(job)), 202
+
+
+@report_bp.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id: str):
+    job = current_app.extensions["report_jobs"].get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(_job_payload(job))
+
+
+@report_bp.route("/jobs/<job_id>/download", methods=["GET"])
+def job_download(job_id: str):
+    queue = current_app.extensions["report_jobs"]
+    job = queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    if job["status"] != "done":
+        return jsonify(_job_payload(job)), 409
+    return send_file(
+        queue.artifact_path(job),
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name="trainsphere_report.pdf",
+    )
+
 
-    # if none or unknown
+@report_bp.route("", methods=["GET"])
+def page():
     return render_template("report.html", active="report")
+
+
+@report_bp.route("/export", methods=["GET"])
+def export():
+    format = (request.args.get("format") or "none").lower()
+
+    if format == "csv" and request.args.get("stream"):
+        date_from = _parse_date(request.args.get("from")) or "0000-01-01"
+        date_to = _parse_date(request.args.get("to")) or "9999-12-31"
+        # no Content-Length, so the body goes out with chunked transfer encoding
+        return Response(
+            stream_with_context(stream_history_csv(date_from, date_to)),
+            mimetype="text/csv",
+            headers={"Content-Disposition": "attachment; filename=trainsphere_history.csv"},
+        )
+
+    if format not in EXPORT_FORMATS:
+        # if none or unknown
+        return render_template("report.html", active="report")
+
+    # Artifacts are cached per data_version: identical data -> identical bytes,
+    # so a repeat download is a dict lookup and a matching ETag is a 304.
+    cache = current_app.extensions["report_cache"]
+    key = (format, db.data_version(get_db()))
+    entry = cache.get(key)
+    if entry is None:
+        report = fetch_report()
+        if format == "csv":
+            body = render_csv(report)
+        else:
+            mem = io.BytesIO()
+            render_pdf(mem, report)
+            body = mem.getvalue()
+        entry = (hashlib.sha256(body).hexdigest(), body)
+        cache.put(key, entry)
+
+    etag, body = entry
+    mimetype, download_name = EXPORT_FORMATS[format]
+    response = send_file(
+        io.BytesIO(body),
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=download_name,
+        etag=etag,
+        conditional=True,
+    )
+    response.cache_control.no_cache = True  # always revalidate; 304 is cheap
+    return response
@@ -0,0 +1,124 @@
+import re
+
+from markupsafe import escape
+
+import db
+
+# workout_search is an FTS5 index with rowid = workouts.id: one document per
+# workout holding its type, notes and exercise names. It is refreshed for the
+# touched workouts in the same transaction as every save, import and delete.
+SEARCH_COLUMNS = ("workout_type", "notes", "exercises")
+# bm25 weights in SEARCH_COLUMNS order: an exercise-name hit ranks above a
+# passing mention in the notes
+_WEIGHTS = (2.0, 1.0, 1.5)
+
+# highlight() markers; private-use characters don't turn up in typed text, so the
+# document is HTML-escaped first and the markers become <mark> afterwards
+_OPEN, _CLOSE = "\ue000", "\ue001"
+
+_DOCUMENT_SELECT = """
+    SELECT w.id, w.workout_type, COALESCE(w.notes, ''),
+           COALESCE((SELECT group_concat(x.name, ' · ')
+                     FROM workout_exercises e JOIN exercises x ON x.id = e.exercise_id
+                     WHERE e.workout_id = w.id), '')
+    FROM workouts w
+    WHERE {where}
+"""
+
+# Ranking runs over every match, so it selects ids only; highlight() and
+# snippet() are then computed for the one page of rows actually returned.
+_RANKED_SQL = f"""
+    SELECT rowid, bm25(workout_search, {", ".join(map(str, _WEIGHTS))}) AS rank
+    FROM workout_search
+    WHERE workout_search MATCH ?
+    ORDER BY rank, rowid
+    LIMIT ? OFFSET ?
+"""
+
+_PAGE_SQL = f"""
+    SELECT w.id, w.workout_date, w.workout_type, w.category, w.duration_minutes,
+           highlight(workout_search, 0, '{_OPEN}', '{_CLOSE}') AS type_hl,
+           snippet(workout_search, 1, '{_OPEN}', '{_CLOSE}', '…', 24) AS notes_hl,
+           highlight(workout_search, 2, '{_OPEN}', '{_CLOSE}') AS exercises_hl
+    FROM workout_search
+    JOIN workouts w ON w.id = workout_search.rowid
+    WHERE workout_search MATCH ? AND workout_search.rowid IN ({{q_marks}})
+"""
+
+
+def refresh_workouts(conn, workout_ids) -> None:
+    """Re-index the given workouts; ids that no longer exist drop out."""
+    ids = sorted(set(workout_ids))
+    if not ids:
+        return
+    q_marks = ",".join(["?"] * len(ids))
+    conn.execute(f"DELETE FROM workout_search WHERE rowid IN ({q_marks})", ids)
+    conn.execute(
+        "INSERT INTO workout_search (rowid, workout_type, notes, exercises) "
+        + _DOCUMENT_SELECT.format(where=f"w.id IN ({q_marks})"),
+        ids,
+    )
+
+
+def rebuild(conn) -> None:
+    conn.execute("DELETE FROM workout_search")
+    conn.execute(
+        "INSERT INTO workout_search (rowid, workout_type, notes, exercises) "
+        + _DOCUMENT_SELECT.format(where="1")
+    )
+
+
+def match_query(text: str) -> str | None:
+    """Turn free text into an FTS5 query: every word must match, the last as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation typed by the user are
+    searched for literally instead of raising a syntax error.
+    """
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _marked(text: str) -> str:
+    return str(escape(text or "")).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+
+
+def search(conn, text: str, limit: int, offset: int = 0) -> tuple[list[dict], bool]:
+    """Best-ranked workouts for `text` and whether more results follow."""
+    query = match_query(text)
+    if query is None:
+        return [], False
+    ranked = conn.execute(_RANKED_SQL, (query, limit + 1, offset)).fetchall()
+    page = ranked[:limit]
+    if not page:
+        return [], False
+    ids = [r["rowid"] for r in page]
+    rows = {
+        r["id"]: r
+        for r in conn.execute(
+            _PAGE_SQL.format(q_marks=",".join(["?"] * len(ids))), (query, *ids)
+        ).fetchall()
+    }
+    results = []
+    for ranked_row in page:
+        r = rows.get(ranked_row["rowid"])
+        if r is None:  # deleted between the two queries
+            continue
+        results.append({
+            "id": r["id"],
+            "workout_date": r["workout_date"],
+            "workout_type": r["workout_type"],
+            "category": r["category"],
+            "duration_minutes": r["duration_minutes"],
+            "rank": ranked_row["rank"],
+            "workout_type_html": _marked(r["type_hl"]),
+            "notes_html": _marked(r["notes_hl"]),
+            "exercises_html": _marked(r["exercises_hl"]),
+        })
+    return results, len(ranked) > limit
+
+
+db.register_rebuilder("search", rebuild)
@@ -0,0 +1,119 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+from flask import has_request_context, jsonify, request
+
+# Statements slower than db.SLOW_QUERY_SECONDS, newest last. Entries carry the
+# normalized SQL and the shape of the parameters, never their values.
+DEFAULT_SIZE = 200
+PLAN_CACHE_SIZE = 256
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_entries: deque = deque(maxlen=DEFAULT_SIZE)
+_plans: dict = {}  # normalized sql -> EXPLAIN QUERY PLAN details
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize(sql: str) -> str:
+    """One line, literals replaced by ?, IN (?, ?, ...) collapsed to IN (?...)."""
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    return _IN_LIST.sub("(?...)", sql)
+
+
+def params_shape(params, many: bool) -> dict:
+    if many:
+        rows = params if isinstance(params, (list, tuple)) else list(params)
+        return {"rows": len(rows), "per_row": params_shape(rows[0], False) if rows else None}
+    if isinstance(params, dict):
+        return {"named": sorted(params)}
+    types = [type(p).__name__ for p in params]
+    return {"count": len(types), "types": types[:10]}
+
+
+def record(sql: str, params, many: bool, seconds: float, explain, entry: dict | None) -> dict:
+    """Log a slow statement, or update `entry` if it was logged already.
+
+    A statement is first logged when its time crosses the threshold; later
+    fetches from the same cursor only raise the recorded duration.
+    `explain()` returns the query plan and is called once per distinct SQL.
+    """
+    if entry is not None:
+        entry["duration_ms"] = round(seconds * 1000, 2)
+        return entry
+
+    normalized = normalize(sql)
+    plan = _plans.get(normalized)
+    if plan is None:
+        plan = explain()
+        with _lock:
+            if len(_plans) >= PLAN_CACHE_SIZE:
+                _plans.clear()
+            _plans[normalized] = plan
+
+    entry = {
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "endpoint": request.endpoint if has_request_context() else None,
+        "sql": normalized,
+        "params": params_shape(params, many),
+        "duration_ms": round(seconds * 1000, 2),
+        "plan": plan,
+    }
+    with _lock:
+        _entries.append(entry)
+    logger.warning("slow query (%.1f ms, %s): %s | plan: %s",
+                   seconds * 1000, entry["endpoint"], normalized, " | ".join(plan))
+    return entry
+
+
+def entries() -> list[dict]:
+    with _lock:
+        return [dict(e) for e in _entries]
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+        _plans.clear()
+
+
+def init_app(app) -> None:
+    """SLOW_QUERY_MS sets the threshold (None/0 turns the log off),
+    SLOW_QUERY_LOG_SIZE the number of entries kept, and SLOW_QUERY_ENDPOINT
+    serves them at /debug/slow-queries (default: only in debug mode, since
+    the entries show SQL and query plans)."""
+    import db
+
+    global _entries
+    threshold_ms = app.config.get("SLOW_QUERY_MS", 100)
+    db.SLOW_QUERY_SECONDS = threshold_ms / 1000 if threshold_ms else None
+    size = int(app.config.get("SLOW_QUERY_LOG_SIZE", DEFAULT_SIZE))
+    with _lock:
+        _entries = deque(_entries, maxlen=size)
+
+    if app.config.get("SLOW_QUERY_ENDPOINT", app.debug):
+        app.add_url_rule("/debug/slow-queries", "slow_queries", slow_queries_view)
+
+
+def slow_queries_view():
+    """Newest first; ?full_scans=1 keeps only plans with a scan or temp sort."""
+    import db
+
+    items = entries()[::-1]
+    if request.args.get("full_scans"):
+        items = [e for e in items if db.plan_problems(e["plan"])]
+    threshold = db.SLOW_QUERY_SECONDS
+    return jsonify({
+        "threshold_ms": threshold * 1000 if threshold else None,
+        "entries": items,
+    })
@@ -5,6 +5,8 @@ const templates = templatesEl ? JSON.parse(templatesEl.textContent) : {};
 
 const STORAGE_KEY = "trainsphere.selected_workout_type";
 const DRAFT_KEY_PREFIX = "trainsphere.progress_draft.";
+const SYNC_QUEUE_KEY = "trainsphere.sync_queue";
+const SYNC_BATCH = 200;  // MAX_SYNC_BATCH in routes/progress.py
 
 function isEditMode() {
   const rows = document.getElementById("exerciseRows");
@@ -180,12 +182,232 @@ function clearDraft() {
   loadTemplate();
 }
 
+// --- saves and deletes through the JSON API, patching the page in place ---
+function apiRequest(url, method, body) {
+  const headers = { Accept: "application/json" };
+  if (body !== undefined) headers["Content-Type"] = "application/json";
+  return fetch(url, { method, headers, body: body === undefined ? undefined : JSON.stringify(body) });
+}
+
+function collectWorkout() {
+  return {
+    workout_type: document.getElementById("workoutType")?.value || "",
+    ...collectMeta(),
+    exercises: collectExercises()
+  };
+}
+
+// Put a saved workout's card where the listing would have it (newest first),
+// or drop it when it no longer matches the page's filters.
+function showWorkout(w) {
+  const list = document.querySelector(".workout-history");
+  if (!list) { window.location.reload(); return; }  // first workout in this view
+
+  const existing = list.querySelector(`[data-workout-id="${w.id}"]`);
+  if (existing) existing.remove();
+
+  const f = list.dataset;
+  const visible = (!f.category || w.category === f.category) &&
+    (!f.from || w.workout_date >= f.from) && (!f.to || w.workout_date <= f.to);
+  if (!visible) return;
+
+  const tpl = document.createElement("template");
+  tpl.innerHTML = w.html.trim();
+  const card = tpl.content.firstElementChild;
+
+  const before = Array.from(list.querySelectorAll("[data-workout-id]")).find(el =>
+    el.dataset.date < w.workout_date ||
+    (el.dataset.date === w.workout_date && Number(el.dataset.workoutId) < w.id));
+  if (before) list.insertBefore(card, before);
+  else if (!document.getElementById("historySentinel")) list.appendChild(card);
+  // otherwise it sorts below the loaded pages and arrives with a later one
+}
+
+function leaveEditMode(form) {
+  form.querySelector('input[name="workout_id"]')?.remove();
+  const rows = document.getElementById("exerciseRows");
+  if (rows) rows.dataset.editMode = "0";
+
+  const title = document.getElementById("workoutFormTitle");
+  if (title) title.textContent = "Log workout";
+  const hint = document.getElementById("workoutFormHint");
+  if (hint) hint.textContent = "Choose a workout template, edit sets/reps/weight, and save.";
+  const submit = document.getElementById("workoutSubmit");
+  if (submit) submit.textContent = "Finish";
+  document.getElementById("workoutCancel")?.remove();
+
+  const url = new URL(window.location.href);
+  url.searchParams.delete("edit");
+  history.replaceState(null, "", url);
+}
+
+// --- new workouts go through an offline queue, uploaded by /progress/api/sync ---
+function readQueue() {
+  try {
+    const queue = JSON.parse(localStorage.getItem(SYNC_QUEUE_KEY) || "[]");
+    return Array.isArray(queue) ? queue : [];
+  } catch (e) {
+    return [];
+  }
+}
+
+function writeQueue(queue) {
+  try { localStorage.setItem(SYNC_QUEUE_KEY, JSON.stringify(queue)); } catch (e) {}
+}
+
+function newSyncKey() {
+  if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
+function todayISO() {
+  const d = new Date();
+  return new Date(d.getTime() - d.getTimezoneOffset() * 60000).toISOString().slice(0, 10);
+}
+
+function showSyncStatus() {
+  const el = document.getElementById("syncStatus");
+  if (!el) return;
+  const n = readQueue().length;
+  el.hidden = n === 0;
+  el.textContent = n === 1 ? "1 workout saved offline, waiting to sync."
+    : `${n} workouts saved offline, waiting to sync.`;
+}
+
+let syncing = null;
+
+// Upload the queue; keys make a retried upload safe, so an item only leaves
+// the queue once the server has answered for it.
+function syncQueue(url) {
+  if (syncing || !url) return syncing;
+  syncing = (async () => {
+    try {
+      let queue = readQueue();
+      while (queue.length) {
+        const res = await apiRequest(url, "POST", { workouts: queue.slice(0, SYNC_BATCH) });
+        if (!res.ok) break;
+        const data = await res.json();
+        const done = new Set([...data.results, ...data.errors].map(r => r.key));
+        // re-read: workouts may have been queued while the request was out
+        queue = readQueue().filter(item => !done.has(item.key));
+        writeQueue(queue);
+        data.results.forEach(r => { if (r.workout) showWorkout(r.workout); });
+        if (!done.size) break;
+      }
+    } catch (e) {
+      // offline: keep the queue for the next attempt
+    } finally {
+      syncing = null;
+      showSyncStatus();
+    }
+  })();
+  return syncing;
+}
+
+async function submitWorkout(e) {
+  const form = e.currentTarget;
+  e.preventDefault();
+
+  if (draftTimer) clearTimeout(draftTimer);
+  const type = document.getElementById("workoutType")?.value || "";
+  try { localStorage.removeItem(draftKey(type)); } catch (err) {}
+
+  const id = form.querySelector('input[name="workout_id"]')?.value;
+  if (!id) {
+    const workout = collectWorkout();
+    // the date it was logged, not the date it finally syncs
+    workout.workout_date = workout.workout_date || todayISO();
+    const key = newSyncKey();
+    writeQueue([...readQueue(), { key, ...workout }]);
+    if (!readQueue().some(item => item.key === key)) {
+      form.submit();  // no localStorage: post it directly
+      return;
+    }
+    loadTemplate();
+    showSyncStatus();
+    syncQueue(form.dataset.sync);
+    return;
+  }
+
+  try {
+    const res = await apiRequest(`${form.dataset.api}/${id}`, "PUT", collectWorkout());
+    if (!res.ok) throw new Error(res.statusText);
+    const data = await res.json();
+    leaveEditMode(form);
+    showWorkout(data.workout);
+    loadTemplate();
+  } catch (err) {
+    form.submit();  // plain POST + redirect still works
+  }
+}
+
+async function deleteWorkout(e) {
+  const card = e.target.closest("[data-workout-id]");
+  if (!card || e.defaultPrevented) return;  // not a delete form, or confirm() said no
+  e.preventDefault();
+
+  const list = e.currentTarget;
+  try {
+    const res = await apiRequest(`${list.dataset.api}/${card.dataset.workoutId}`, "DELETE");
+    if (!res.ok && res.status !== 404) throw new Error(res.statusText);
+    card.remove();
+  } catch (err) {
+    e.target.submit();
+  }
+}
+
+// --- infinite scroll through /progress/api/workouts (keyset pagination) ---
+let historyLoading = false;
+
+async function loadMoreHistory(sentinel, observer) {
+  if (historyLoading || !sentinel.dataset.cursor) return;
+  historyLoading = true;
+
+  const params = new URLSearchParams({ cursor: sentinel.dataset.cursor });
+  if (sentinel.dataset.category) params.set("category", sentinel.dataset.category);
+  if (sentinel.dataset.from) params.set("from", sentinel.dataset.from);
+  if (sentinel.dataset.to) params.set("to", sentinel.dataset.to);
+
+  try {
+    const res = await fetch(`${sentinel.dataset.url}?${params}`, { headers: { Accept: "application/json" } });
+    if (!res.ok) throw new Error(res.statusText);
+    const data = await res.json();
+
+    const list = document.querySelector(".workout-history");
+    data.workouts.forEach(w => list.insertAdjacentHTML("beforeend", w.html));
+
+    if (data.next_cursor) {
+      sentinel.dataset.cursor = data.next_cursor;
+    } else {
+      observer.disconnect();
+      sentinel.remove();
+    }
+  } catch (e) {
+    sentinel.textContent = "Could not load more workouts.";
+    observer.disconnect();
+  } finally {
+    historyLoading = false;
+  }
+}
+
+function initHistoryScroll() {
+  const sentinel = document.getElementById("historySentinel");
+  if (!sentinel || !("IntersectionObserver" in window)) return;
+
+  const observer = new IntersectionObserver(entries => {
+    if (entries.some(e => e.isIntersecting)) loadMoreHistory(sentinel, observer);
+  }, { rootMargin: "400px" });
+  observer.observe(sentinel);
+}
+
 // expose functions for inline HTML handlers
 window.loadTemplate = loadTemplate;
 window.clearDraft = clearDraft;
 
 // init
 (function init() {
+  initHistoryScroll();
+
   // mark user-changed category
   const cat = document.getElementById("workoutCategory");
   if (cat) cat.addEventListener("change", () => { cat.dataset.userChanged = "1"; });
@@ -194,12 +416,18 @@ window.clearDraft = clearDraft;
   if (form) {
     form.addEventListener("input", scheduleDraftSave);
     form.addEventListener("change", scheduleDraftSave);
-    form.addEventListener("submit", () => {
-      const type = document.getElementById("workoutType")?.value || "";
-      try { localStorage.removeItem(draftKey(type)); } catch (e) {}
-    });
+    if (form.dataset.api && window.fetch) form.addEventListener("submit", submitWorkout);
   }
 
+  if (form && form.dataset.sync && window.fetch) {
+    showSyncStatus();
+    syncQueue(form.dataset.sync);
+    window.addEventListener("online", () => syncQueue(form.dataset.sync));
+  }
+
+  const historyList = document.querySelector(".workout-history");
+  if (historyList && window.fetch) historyList.addEventListener("submit", deleteWorkout);
+
   // if editing an existing workout, do NOT overwrite server-rendered exercise rows on first load
   if (isEditMode()) return;
 
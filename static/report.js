@@ -0,0 +1,58 @@
+// static/report.js
+
+const POLL_MS = 1000;
+
+// text only: job.error and statusText come from the server
+function setJobStatus(text, downloadUrl) {
+  const el = document.getElementById("pdfJobStatus");
+  if (!el) return;
+  el.textContent = text;
+  if (downloadUrl) {
+    const link = document.createElement("a");
+    link.className = "btn secondary";
+    link.href = downloadUrl;
+    link.textContent = "Download PDF";
+    el.append(" ", link);
+  }
+}
+
+async function pollJob(statusUrl) {
+  try {
+    const res = await fetch(statusUrl, { headers: { Accept: "application/json" } });
+    const job = await res.json();
+
+    if (job.status === "done") {
+      setJobStatus("Ready:", job.download_url);
+      return;
+    }
+    if (job.status === "failed" || !res.ok) {
+      setJobStatus(`Export failed: ${job.error || res.statusText}`);
+      return;
+    }
+    setJobStatus(job.status === "running" ? "Rendering…" : "Queued…");
+  } catch (e) {
+    setJobStatus("Lost connection, retrying…");
+  }
+  setTimeout(() => pollJob(statusUrl), POLL_MS);
+}
+
+(function init() {
+  const form = document.getElementById("pdfJobForm");
+  if (!form) return;
+
+  form.addEventListener("submit", async (ev) => {
+    ev.preventDefault();
+    setJobStatus("Submitting…");
+    try {
+      const res = await fetch(form.action, { method: "POST", body: new FormData(form) });
+      const job = await res.json();
+      if (!res.ok) {
+        setJobStatus(job.error || res.statusText);
+        return;
+      }
+      pollJob(job.status_url);
+    } catch (e) {
+      setJobStatus("Could not submit the export.");
+    }
+  });
+})();
@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import db  # noqa: E402
+from app import create_app  # noqa: E402
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Builds apps on tmp_path/trainsphere.db (migrated on first use)."""
+    def make(**config):
+        return create_app({
+            "TESTING": True,
+            "DATABASE": str(tmp_path / "trainsphere.db"),
+            "JINJA_CACHE_DIR": None,
+            "REPORT_SPOOL_DIR": str(tmp_path / "report_spool"),
+            **config,
+        })
+    yield make
+    db.stop_writer()
+    db.close_all()
+
+
+@pytest.fixture
+def app(make_app):
+    """An app on a fresh, fully migrated database in a temporary directory."""
+    return make_app()
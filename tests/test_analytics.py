@@ -0,0 +1,19 @@
+import pytest
+
+
+@pytest.mark.parametrize("query", [
+    "grain=year&from=9999-01-01&to=9999-12-31",
+    "grain=month&from=0001-01-01&to=0001-01-31",
+    "grain=day&from=0001-01-05&to=0001-01-09",
+])
+def test_ranges_at_the_calendar_limits_are_rejected(app, query):
+    response = app.test_client().get(f"/progress/api/analytics?{query}")
+    assert response.status_code == 400
+
+
+def test_last_full_month_before_the_limit_still_works(app):
+    response = app.test_client().get(
+        "/progress/api/analytics?grain=month&from=9999-11-01&to=9999-11-30"
+    )
+    assert response.status_code == 200
+    assert response.get_json()["previous"] == {"from": "9999-10-01", "to": "9999-10-31"}
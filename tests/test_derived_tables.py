@@ -0,0 +1,73 @@
+import json
+
+import db
+import importer
+import records
+import rollups
+import search
+
+TABLES = {
+    "exercise_records": "SELECT * FROM exercise_records ORDER BY exercise_id",
+    "rollup_daily": "SELECT * FROM rollup_daily ORDER BY day, category",
+    "rollup_weekly": "SELECT * FROM rollup_weekly ORDER BY week_start, category",
+    "workout_search": "SELECT rowid, * FROM workout_search ORDER BY rowid",
+}
+
+
+def _snapshot(app):
+    with app.app_context():
+        conn = db.get_db()
+        return {name: [tuple(r) for r in conn.execute(sql)] for name, sql in TABLES.items()}
+
+
+def _rebuild(conn):
+    records.rebuild(conn)
+    rollups.rebuild(conn)
+    search.rebuild(conn)
+
+
+def _workout(day, workout_type, notes, *exercises):
+    return {
+        "workout_date": day, "workout_type": workout_type, "notes": notes,
+        "duration_minutes": 45, "performance_rating": 7, "feeling_rating": 6,
+        "exercises": [
+            {"name": name, "sets": sets, "reps": reps, "weight_kg": weight}
+            for name, sets, reps, weight in exercises
+        ],
+    }
+
+
+def test_incremental_upkeep_matches_a_full_rebuild(app):
+    client = app.test_client()
+
+    def create(*args):
+        response = client.post("/progress/api/workouts", json=_workout(*args))
+        assert response.status_code == 201
+        return response.get_json()["workout"]["id"]
+
+    squat_day = create("2024-03-04", "Strength (Lower)", "heavy squats",
+                       ("Squats", 5, 5, 100), ("Leg Press", 3, 10, 150))
+    bench_day = create("2024-03-05", "Strength (Upper)", "bench",
+                       ("Bench Press", 5, 5, 80), ("Squats", 3, 8, 80))
+    create("2024-03-11", "Cardio", "easy run")
+    with app.app_context():
+        summary = importer.import_workouts([
+            json.dumps(_workout("2024-03-04", "Strength (Lower)", "imported",
+                                ("Squats", 3, 3, 95))),
+            json.dumps(_workout("2024-03-06", "HIIT", "imported intervals",
+                                ("Burpees", 4, 10, 0))),
+        ], "jsonl")
+    assert summary["imported"] == 2
+
+    # lower the record-setting lift, move a workout to another week, delete one
+    edited = _workout("2024-03-12", "Strength (Lower)", "lighter squats after all",
+                      ("Squats", 5, 5, 90))
+    assert client.put(f"/progress/api/workouts/{squat_day}", json=edited).status_code == 200
+    assert client.delete(f"/progress/api/workouts/{bench_day}").status_code == 200
+
+    incremental = _snapshot(app)
+    with app.app_context():
+        db.run_write(_rebuild)
+    assert incremental == _snapshot(app)
+    assert all(incremental.values())
+
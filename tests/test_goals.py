@@ -0,0 +1,27 @@
+from datetime import date
+
+import db
+import goals
+
+
+def _add_goal(conn, unit, target_date):
+    return conn.execute(
+        "INSERT INTO goals (metric, target_value, target_unit, target_date) VALUES (?, ?, ?, ?)",
+        ("minutes", 150, unit, target_date),
+    ).lastrowid
+
+
+def test_per_period_goals_end_at_their_target_date(app):
+    today = date(2024, 3, 6)  # a Wednesday
+    with app.app_context():
+        expired, ends_friday, open_ended = db.run_write(lambda conn: (
+            _add_goal(conn, "min/week", "2020-01-01"),
+            _add_goal(conn, "min/week", "2024-03-08"),
+            _add_goal(conn, "min/day", None),
+        ))
+        progress = goals.evaluate(db.get_db(), today)
+
+    assert expired not in progress
+    assert progress[ends_friday]["from"] == "2024-03-04"
+    assert progress[ends_friday]["deadline"] == "2024-03-08"
+    assert progress[open_ended]["deadline"] == "2024-03-06"
@@ -0,0 +1,13 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "bench"))
+
+import import_budget  # noqa: E402
+
+
+def test_app_import_within_budget():
+    # measure() also fails if importing app pulls in reportlab eagerly
+    result = import_budget.measure(runs=3)
+    assert result["app_ms"] <= import_budget.BUDGET_MS, result
+    assert result["without_report_ms"] <= import_budget.WITHOUT_REPORT_MS, result
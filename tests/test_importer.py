@@ -0,0 +1,59 @@
+import json
+
+import db
+import importer
+
+
+def _jsonl(*workouts):
+    return [json.dumps(w) + "\n" for w in workouts]
+
+
+def _workout(notes="", **fields):
+    return {"workout_date": "2024-03-04", "workout_type": "Running", "notes": notes, **fields}
+
+
+def _notes(app):
+    with app.app_context():
+        rows = db.get_db().execute("SELECT notes FROM workouts ORDER BY id").fetchall()
+    return [r[0] for r in rows]
+
+
+def test_invalid_rows_are_skipped_and_the_rest_of_the_batch_saved(app):
+    lines = _jsonl(
+        _workout("one"),
+        _workout("bad date", workout_date="2024-02-30"),
+        _workout("huge", duration_minutes=1e300),
+        _workout("two", exercises=[{"name": "Squat", "sets": 10**30}]),
+        _workout("three"),
+    )
+    with app.app_context():
+        summary = importer.import_workouts(lines, "jsonl", batch_size=10)
+    assert summary["imported"] == 2
+    assert [e["line"] for e in summary["errors"]] == [2, 3, 4]
+    assert _notes(app) == ["one", "three"]
+
+
+def test_a_row_the_database_rejects_does_not_abort_its_batch(app, monkeypatch):
+    bulk_insert = importer._bulk_insert_workouts
+
+    def failing(conn, rows):
+        if any(fields["notes"] == "boom" for fields, _exercises in rows):
+            raise OverflowError("boom")
+        return bulk_insert(conn, rows)
+
+    monkeypatch.setattr(importer, "_bulk_insert_workouts", failing)
+    lines = _jsonl(_workout("one"), _workout("boom"), _workout("two"))
+    with app.app_context():
+        summary = importer.import_workouts(lines, "jsonl", batch_size=10)
+    assert (summary["imported"], summary["skipped"]) == (2, 1)
+    assert summary["errors"][0]["line"] == 2
+    assert _notes(app) == ["one", "two"]
+
+
+def test_malformed_csv_is_reported_as_an_error(app):
+    body = "Workout_id,Date,Type,Notes\n1,2024-03-04,Running," + "x" * 200_000 + "\n"
+    response = app.test_client().post(
+        "/progress/import", data=body.encode(), content_type="text/csv"
+    )
+    assert response.status_code == 400
+    assert "malformed CSV" in response.get_json()["error"]
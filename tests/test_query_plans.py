@@ -0,0 +1,11 @@
+import pytest
+
+import db
+
+
+@pytest.mark.parametrize("name", sorted(db.HOT_QUERIES))
+def test_hot_query_uses_an_index(app, name):
+    sql, params = db.HOT_QUERIES[name]
+    with app.app_context():
+        details = db.explain(db.get_db(), sql, params)
+    assert not db.plan_problems(details), " | ".join(details)
@@ -0,0 +1,27 @@
+import pytest
+
+
+def test_csv_export_revalidates_with_its_etag(app):
+    client = app.test_client()
+    first = client.get("/report/export?format=csv")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    again = client.get("/report/export?format=csv", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+
+    client.post("/progress/api/workouts", json={"workout_date": "2024-03-04", "notes": "new"})
+    changed = client.get("/report/export?format=csv", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert b"new" in changed.data
+
+
+def test_pdf_etag_is_stable_while_the_data_is(app):
+    pytest.importorskip("reportlab")
+    client = app.test_client()
+    etag = client.get("/report/export?format=pdf").headers["ETag"]
+    app.extensions["report_cache"].clear()  # rendered again, as another worker would
+    again = client.get("/report/export?format=pdf", headers={"If-None-Match": etag})
+    assert again.status_code == 304
@@ -0,0 +1,5 @@
+def test_page_is_bounded(app):
+    client = app.test_client()
+    response = client.get("/progress/search?q=run&page=99999999999999999999")
+    assert response.status_code == 400
+    assert client.get("/progress/search?q=run&page=1000").status_code == 200
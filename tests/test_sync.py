@@ -0,0 +1,62 @@
+import db
+import routes.progress
+
+
+def _sync(client, *workouts):
+    response = client.post("/progress/api/sync", json={"workouts": list(workouts)})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def _workout(key, **fields):
+    return {"key": key, "workout_date": "2024-03-04", "workout_type": "Running", **fields}
+
+
+def _count(app, table):
+    with app.app_context():
+        return db.get_db().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_resent_keys_are_not_inserted_twice(app):
+    client = app.test_client()
+    first = _sync(client, _workout("a"), _workout("b"), _workout("a"))
+    assert [r["status"] for r in first["results"]] == ["created", "created"]
+
+    again = _sync(client, _workout("a"), _workout("c"))
+    assert [(r["key"], r["status"]) for r in again["results"]] == [
+        ("a", "duplicate"), ("c", "created"),
+    ]
+    assert again["results"][0]["workout_id"] == first["results"][0]["workout_id"]
+    assert _count(app, "workouts") == 3
+
+
+def test_invalid_items_are_reported_and_the_rest_saved(app):
+    data = _sync(
+        app.test_client(),
+        _workout("ok-1"),
+        _workout("bad-date", workout_date="March 4th"),
+        {"workout_type": "no key"},
+        _workout("bad-exercises", exercises=5),
+        _workout("ok-2"),
+    )
+    assert [r["key"] for r in data["results"]] == ["ok-1", "ok-2"]
+    assert [(e["index"], e["key"]) for e in data["errors"]] == [
+        (1, "bad-date"), (2, None), (3, "bad-exercises"),
+    ]
+    assert _count(app, "workouts") == 2
+
+
+def test_item_failing_to_write_does_not_fail_the_batch(app, monkeypatch):
+    bulk_insert = routes.progress._bulk_insert_workouts
+
+    def failing(conn, batch):
+        if any(fields["notes"] == "boom" for fields, _exercises in batch):
+            raise ValueError("boom")
+        return bulk_insert(conn, batch)
+
+    monkeypatch.setattr(routes.progress, "_bulk_insert_workouts", failing)
+    data = _sync(app.test_client(), _workout("a"), _workout("b", notes="boom"), _workout("c"))
+    assert [r["key"] for r in data["results"]] == ["a", "c"]
+    assert [(e["index"], e["key"]) for e in data["errors"]] == [(1, "b")]
+    assert _count(app, "workouts") == 2
+    assert _count(app, "sync_keys") == 2
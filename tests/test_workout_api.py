@@ -0,0 +1,31 @@
+import pytest
+
+
+@pytest.mark.parametrize("field, value", [
+    ("duration_minutes", 1e300),
+    ("duration_minutes", 2**63),
+    ("exercises", [{"name": "Squat", "reps": -(2**64)}]),
+])
+def test_numbers_sqlite_cannot_store_are_rejected(app, field, value):
+    response = app.test_client().post("/progress/api/workouts", json={
+        "workout_date": "2024-03-04", "workout_type": "Running", field: value,
+    })
+    assert response.status_code == 400
+    assert "out of range" in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("field, value", [
+    ("duration_minutes", "9" * 20),
+    ("workout_id", "9" * 20),
+    ("sets[]", "-" + "9" * 20),
+])
+def test_form_numbers_sqlite_cannot_store_are_rejected(app, field, value):
+    data = {"workout_date": "2024-03-04", "workout_type": "Running",
+            "exercise_name[]": "Squat", field: value}
+    response = app.test_client().post("/progress", data=data)
+    assert response.status_code == 400
+    assert "out of range" in response.get_json()["error"]
+
+
+def test_out_of_range_edit_id_is_ignored(app):
+    assert app.test_client().get("/progress?edit=" + "9" * 20).status_code == 200
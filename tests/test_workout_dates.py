@@ -0,0 +1,55 @@
+import sqlite3
+
+import db
+import migrations
+
+
+def _stored(app):
+    with app.app_context():
+        conn = db.get_db()
+        dates = [r[0] for r in conn.execute("SELECT workout_date FROM workouts ORDER BY id")]
+        weeks = [r[0] for r in conn.execute("SELECT week_start FROM rollup_weekly")]
+    return dates, weeks
+
+
+def test_unpadded_dates_are_stored_in_iso_form(app):
+    client = app.test_client()
+    response = client.post("/progress", data={
+        "workout_date": "2024-1-5", "workout_type": "Running", "duration_minutes": "30",
+    })
+    assert response.status_code == 302
+    response = client.post("/progress/api/workouts", json={
+        "workout_date": "2024-1-6", "workout_type": "Running", "exercises": [],
+    })
+    assert response.status_code == 201
+    assert response.get_json()["workout"]["workout_date"] == "2024-01-06"
+    response = client.post("/progress/api/sync", json={"workouts": [
+        {"key": "k1", "workout_date": "2024-1-7", "workout_type": "Running"},
+    ]})
+    assert response.status_code == 200
+
+    dates, weeks = _stored(app)
+    assert dates == ["2024-01-05", "2024-01-06", "2024-01-07"]
+    assert weeks == ["2024-01-01"]
+
+
+def test_migration_normalizes_legacy_dates(tmp_path, make_app):
+    conn = sqlite3.connect(tmp_path / "trainsphere.db")
+    migrations.upgrade(conn, 5)
+    conn.executemany(
+        "INSERT INTO workouts (workout_date, workout_type, category, duration_minutes) "
+        "VALUES (?, 'Running', 'Cardio', 30)",
+        [("2024-1-5",), ("2024-01-09",), (" 2024-2-29 ",)],
+    )
+    conn.commit()
+    conn.close()
+
+    dates, weeks = _stored(make_app())
+    assert dates == ["2024-01-05", "2024-01-09", "2024-02-29"]
+    assert sorted(weeks) == ["2024-01-01", "2024-01-08", "2024-02-26"]
+
+
+def test_rollups_default_range_is_clamped_to_the_first_day(app):
+    response = app.test_client().get("/progress/api/rollups?to=0001-01-02")
+    assert response.status_code == 200
+    assert response.get_json()["from"] == "0001-01-01"
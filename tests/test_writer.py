@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+import db
+
+
+def _insert(value, fail=False):
+    def job(conn):
+        conn.execute("INSERT INTO writer_test (value) VALUES (?)", (value,))
+        if fail:
+            raise RuntimeError(value)
+        return value
+    return job
+
+
+def _queue_behind_a_blocked_job(*jobs):
+    """Submit `jobs` while the writer is busy, so they are taken as one group."""
+    writer = db._get_writer()
+    release = threading.Event()
+    blocker = writer.submit(lambda conn: release.wait(5))
+    futures = [writer.submit(fn, alone) for fn, alone in jobs]
+    release.set()
+    blocker.result(timeout=5)
+    return futures
+
+
+def _values(app):
+    with app.app_context():
+        rows = db.get_db().execute("SELECT value FROM writer_test ORDER BY value").fetchall()
+    return [r[0] for r in rows]
+
+
+@pytest.fixture
+def writer_app(app):
+    with app.app_context():
+        db.run_write(lambda conn: conn.execute("CREATE TABLE writer_test (value TEXT)"))
+    return app
+
+
+def test_failing_job_is_rolled_back_without_its_group(writer_app):
+    ok_1, failing, ok_2 = _queue_behind_a_blocked_job(
+        (_insert("a"), False), (_insert("b", fail=True), False), (_insert("c"), False),
+    )
+    assert ok_1.result(timeout=5)[0] == "a"
+    assert ok_2.result(timeout=5)[0] == "c"
+    with pytest.raises(RuntimeError):
+        failing.result(timeout=5)
+    assert _values(writer_app) == ["a", "c"]
+
+
+def test_alone_job_commits_apart_from_the_group_before_it(writer_app):
+    grouped, alone = _queue_behind_a_blocked_job(
+        (_insert("a"), False), (_insert("b", fail=True), True),
+    )
+    assert grouped.result(timeout=5)[0] == "a"
+    with pytest.raises(RuntimeError):
+        alone.result(timeout=5)
+    assert _values(writer_app) == ["a"]